@@ -5,7 +5,8 @@ set -o errexit
 # Install dependencies
 pip install -r requirements.txt
 
-# Create static files
+# Verify the pinned front-end libraries (sha256) and create static files
+python manage.py vendor_assets
 python manage.py collectstatic --no-input
 
 # Apply migrations
@@ -0,0 +1,271 @@
+"""
+Índice en memoria de las licencias: "¿quién falta el día X / en [A, B]?"
+sin consultar la base en cada request.
+
+Es un árbol de intervalos centrado sobre el dominio de fechas (ordinales):
+cada nodo tiene un centro fijo y guarda los registros cuyo intervalo contiene
+ese centro, en dos listas ordenadas (por inicio y por fin); los que quedan
+enteramente a la izquierda o a la derecha bajan al hijo correspondiente. Como
+los centros dependen del dominio y no de los datos, insertar y borrar no
+requieren rebalancear. Una consulta recorre O(log D) nodos (D = días del
+dominio, unos 22 niveles) y en cada uno toma con bisect el tramo de la lista
+que coincide: O(log D + k) para k resultados.
+
+Solo se indexan los registros de agentes activos. Cada proceso arma su
+propio índice con la primera consulta (no en el precalentamiento, que con
+preload_app corre antes del fork y dejaría a todos los workers con una copia
+que cada uno modifica por separado) y lo sincroniza al consultarlo, solo si
+cambió la versión de datos (ver cache.py):
+- trae los registros con `updated_at` posterior a la última sincronización
+  (con un margen para transacciones lentas), de cualquier agente: reemplaza en
+  el índice los de agentes activos y quita los demás (un registro reasignado
+  a un agente inactivo),
+- si además se borraron registros (contador `record_deletions`), compara los
+  ids del índice con los de la tabla y quita los que ya no existen,
+- si cambiaron los agentes (`agents_version`, por ejemplo al desactivar o
+  reactivar uno) quita los registros de los agentes inactivos y carga los de
+  los activos que no tenían ninguno en el índice.
+Cada settings.ABSENCE_INDEX_MAX_AGE segundos se reconstruye completo, por si
+algún cambio no pasó por el ORM.
+"""
+import logging
+import threading
+from bisect import bisect_left
+from datetime import date, timedelta
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db.models import Max
+
+from . import cache
+from .models import Agent, Record
+
+logger = logging.getLogger(__name__)
+
+INDEX_FIELDS = ('id', 'agent_id', 'record_type', 'fecha_inicio', 'fecha_fin')
+SYNC_FIELDS = (*INDEX_FIELDS, 'agent__active')
+# Margen para registros confirmados después de la última sincronización
+SYNC_OVERLAP = timedelta(minutes=5)
+
+
+class _Node:
+    __slots__ = ('center', 'left', 'right', 'by_start', 'by_end')
+
+    def __init__(self, lo, hi):
+        self.center = (lo + hi) // 2
+        self.left = None
+        self.right = None
+        self.by_start = []  # (inicio, id) ordenado
+        self.by_end = []    # (fin, id) ordenado
+
+
+class IntervalIndex:
+    """Árbol de intervalos de fechas (cerrados) con inserción y borrado por id."""
+
+    DOMAIN = (date.min.toordinal(), date.max.toordinal())
+
+    def __init__(self):
+        self.root = _Node(*self.DOMAIN)
+        self.entries = {}  # id -> (agent_id, record_type, inicio, fin) con ordinales
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _node_for(self, start, end, create):
+        """Nodo donde se guarda [start, end]: el primero cuyo centro cae adentro."""
+        node = self.root
+        lo, hi = self.DOMAIN
+        while True:
+            if end < node.center:
+                hi = node.center - 1
+                child = node.left
+                if child is None and create:
+                    child = node.left = _Node(lo, hi)
+            elif start > node.center:
+                lo = node.center + 1
+                child = node.right
+                if child is None and create:
+                    child = node.right = _Node(lo, hi)
+            else:
+                return node
+            if child is None:
+                return None
+            node = child
+
+    def add(self, record_id, agent_id, record_type, start, end):
+        """Agrega (o reemplaza) un registro; `start`/`end` son fechas."""
+        self.add_many([(record_id, agent_id, record_type, start, end)])
+
+    def add_many(self, rows):
+        """
+        Agrega (o reemplaza) registros (id, agent_id, tipo, inicio, fin). Las
+        listas de cada nodo tocado se ordenan una vez al final, no por fila.
+        """
+        rows = {row[0]: row for row in rows}.values()
+        # Primero se quitan las versiones anteriores, con las listas todavía ordenadas
+        for record_id in [row[0] for row in rows if row[0] in self.entries]:
+            self.remove(record_id)
+
+        touched = {}
+        for record_id, agent_id, record_type, start, end in rows:
+            start, end = start.toordinal(), end.toordinal()
+            if end < start:
+                continue
+            node = self._node_for(start, end, create=True)
+            node.by_start.append((start, record_id))
+            node.by_end.append((end, record_id))
+            touched[id(node)] = node
+            self.entries[record_id] = (agent_id, record_type, start, end)
+        for node in touched.values():
+            node.by_start.sort()
+            node.by_end.sort()
+
+    def remove(self, record_id):
+        entry = self.entries.pop(record_id, None)
+        if entry is None:
+            return
+        _, _, start, end = entry
+        node = self._node_for(start, end, create=False)
+        del node.by_start[bisect_left(node.by_start, (start, record_id))]
+        del node.by_end[bisect_left(node.by_end, (end, record_id))]
+
+    def overlapping(self, start, end):
+        """Ids de los registros que se superponen con [start, end] (fechas)."""
+        first, last = start.toordinal(), end.toordinal()
+        found = []
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            if node is None:
+                continue
+            if last < node.center:
+                # Todos terminan en el centro o después: alcanza con inicio <= last
+                stop = bisect_left(node.by_start, (last + 1,))
+                found.extend(record_id for _, record_id in node.by_start[:stop])
+                pending.append(node.left)
+            elif first > node.center:
+                # Todos empiezan en el centro o antes: alcanza con fin >= first
+                begin = bisect_left(node.by_end, (first,))
+                found.extend(record_id for _, record_id in node.by_end[begin:])
+                pending.append(node.right)
+            else:
+                found.extend(record_id for _, record_id in node.by_start)
+                pending.append(node.left)
+                pending.append(node.right)
+        return found
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def _indexed_records():
+    return Record.objects.filter(agent__active=True)
+
+
+class _SyncedIndex(IntervalIndex):
+    def __init__(self):
+        super().__init__()
+        self.data_version = None
+        self.deletions = None
+        self.agents_version = None
+        self.synced_until = None  # mayor updated_at leído
+        self.built_at = monotonic()
+
+    def load(self, records):
+        # La marca se lee antes que las filas: lo que cambie en el medio se
+        # vuelve a leer en la próxima sincronización
+        last_update = records.aggregate(last=Max('updated_at'))['last']
+        inactive = []
+        active = []
+        for *row, agent_active in records.values_list(*SYNC_FIELDS).iterator(chunk_size=2000):
+            (active if agent_active else inactive).append(row)
+        self.add_many(active)
+        for row in inactive:
+            self.remove(row[0])
+        if last_update is not None and (self.synced_until is None or last_update > self.synced_until):
+            self.synced_until = last_update
+
+    def drop_deleted(self):
+        existing = set(_indexed_records().values_list('id', flat=True).iterator(chunk_size=10000))
+        for record_id in self.entries.keys() - existing:
+            self.remove(record_id)
+
+    def sync_agents(self):
+        active = set(Agent.objects.filter(active=True).values_list('id', flat=True))
+        indexed = set()
+        for record_id, (agent_id, *_) in list(self.entries.items()):
+            if agent_id in active:
+                indexed.add(agent_id)
+            else:
+                self.remove(record_id)
+        # Reactivados (o sin registros todavía): sus registros no cambiaron de
+        # updated_at, así que la carga incremental no los trae
+        missing = active - indexed
+        if missing:
+            self.add_many(
+                Record.objects.filter(agent_id__in=missing)
+                .values_list(*INDEX_FIELDS)
+                .iterator(chunk_size=2000)
+            )
+
+
+def _build(data_version, deletions, agents_version):
+    started = perf_counter()
+    index = _SyncedIndex()
+    index.data_version, index.deletions = data_version, deletions
+    index.agents_version = agents_version
+    index.load(_indexed_records())
+    logger.info(
+        f'Índice de ausencias: {len(index)} registros en {(perf_counter() - started) * 1000:.0f} ms'
+    )
+    return index
+
+
+def _current_index():
+    """Índice del proceso, sincronizado con la versión de datos actual. Llamar con _lock."""
+    global _index
+    data_version = cache.data_version()
+    deletions = cache.record_deletions()
+    agents_version = cache.agents_version()
+    max_age = getattr(settings, 'ABSENCE_INDEX_MAX_AGE', 3600)
+
+    if _index is None or monotonic() - _index.built_at > max_age:
+        _index = _build(data_version, deletions, agents_version)
+        return _index
+
+    # (Sin versión, por ejemplo con DummyCache, se sincroniza siempre)
+    if data_version is None or _index.data_version != data_version:
+        changed = Record.objects.all()
+        if _index.synced_until is not None:
+            changed = changed.filter(updated_at__gte=_index.synced_until - SYNC_OVERLAP)
+        _index.load(changed)
+        if deletions is None or _index.deletions != deletions:
+            _index.drop_deleted()
+        _index.data_version, _index.deletions = data_version, deletions
+    if agents_version is None or _index.agents_version != agents_version:
+        _index.sync_agents()
+        _index.agents_version = agents_version
+    return _index
+
+
+def absent_between(start, end):
+    """
+    Registros que se superponen con [start, end], como diccionarios con
+    record_id, agent_id, record_type, fecha_inicio y fecha_fin, ordenados por
+    agente y fecha de inicio.
+    """
+    with _lock:
+        index = _current_index()
+        rows = [(record_id, *index.entries[record_id]) for record_id in index.overlapping(start, end)]
+    rows.sort(key=lambda row: (row[1], row[3], row[0]))
+    return [
+        {
+            'record_id': record_id,
+            'agent_id': agent_id,
+            'record_type': record_type,
+            'fecha_inicio': date.fromordinal(first),
+            'fecha_fin': date.fromordinal(last),
+        }
+        for record_id, agent_id, record_type, first, last in rows
+    ]
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ExperimentappConfig(AppConfig):
     name = 'experimentapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
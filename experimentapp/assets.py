@@ -0,0 +1,53 @@
+"""
+Librerías de front-end (FullCalendar, flatpickr) servidas como estáticos propios.
+
+Los archivos están versionados en static/experimentapp/vendor/ y el sha256 de
+cada uno está fijado abajo. `manage.py vendor_assets` verifica que coincidan
+(corre en el build y falla si falta o cambió alguno); con --download los baja
+del CDN al actualizar una versión y rechaza los que no tengan el hash fijado.
+Al hacer collectstatic WhiteNoise les agrega el hash al nombre, genera las
+copias .gz/.br y las sirve con caché permanente.
+"""
+from functools import lru_cache
+
+from django.templatetags.static import static
+
+VENDOR_DIR = 'experimentapp/vendor'
+CDN_URL = 'https://cdn.jsdelivr.net/npm/'
+
+# nombre -> (paquete@versión, archivo dentro del paquete, sha256)
+VENDOR_ASSETS = {
+    # FullCalendar 6 inyecta sus estilos desde el JS: no tiene .css
+    'fullcalendar.js': (
+        'fullcalendar@6.1.15', 'index.global.min.js',
+        '17a5cd70f9807a65d847c23a83626b4d58cd2e8649ce17dea874f1c0eb96c1c1',
+    ),
+    'flatpickr.js': (
+        'flatpickr@4.6.13', 'dist/flatpickr.min.js',
+        'f8dd3f8f0ef355d62bd21f2a0a8d0c6c1cae055f5610403b5c894ed771687d28',
+    ),
+    'flatpickr.css': (
+        'flatpickr@4.6.13', 'dist/flatpickr.min.css',
+        '847e19bf7d5529fd8a30e26f214a6120c1cc8578df4cea7ae5405be87e76b101',
+    ),
+}
+
+
+def static_path(name):
+    package, filename, _ = VENDOR_ASSETS[name]
+    return f'{VENDOR_DIR}/{package}/{filename}'
+
+
+def cdn_url(name):
+    package, filename, _ = VENDOR_ASSETS[name]
+    return f'{CDN_URL}{package}/{filename}'
+
+
+def expected_sha256(name):
+    return VENDOR_ASSETS[name][2]
+
+
+@lru_cache(maxsize=None)
+def asset_url(name):
+    """URL (con hash en producción) de la librería versionada."""
+    return static(static_path(name))
@@ -0,0 +1,153 @@
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max, Min, Q
+
+from . import business_days
+from .models import Agent, AgentStatus, Record
+
+
+def _active_leave_ends(agent_ids, today):
+    """{agent_id: último fecha_fin} de los registros activos HOY (una consulta)."""
+    active_records = Record.objects.filter(
+        fecha_inicio__lte=today,
+        fecha_fin__gte=today
+    )
+    if agent_ids is not None:
+        active_records = active_records.filter(agent_id__in=agent_ids)
+
+    return dict(
+        active_records
+        .values('agent_id')
+        .annotate(last_end=Max('fecha_fin'))
+        .values_list('agent_id', 'last_end')
+    )
+
+
+def status_for(statuses, agent_id):
+    """Obtiene el estado de un agente a partir del resultado en bloque."""
+    return statuses.get(agent_id, {'available': True, 'return_date': None, 'next_leave_start': None})
+
+
+# --- Estado precalculado (AgentStatus) ---------------------------------------
+#
+# Cada agente con licencias activas o futuras tiene una fila en AgentStatus.
+# Las señales de Record la recalculan al guardar/borrar, y el primer acceso de
+# cada día (o el comando refresh_agent_status) recalcula solo las filas cuyo
+# estado cambia a medianoche: licencias que terminaron o que empiezan hoy.
+# Un agente sin fila está disponible y no tiene licencias programadas.
+
+_rolled_over_on = None
+
+
+def refresh_snapshots(agent_ids=None, today=None):
+    """
+    Recalcula el estado de `agent_ids` (todos si es None) con dos consultas
+    agregadas y lo guarda en bloque.
+    """
+    today = today or date.today()
+    agents = Agent.objects.all()
+    if agent_ids is not None:
+        agents = agents.filter(id__in=agent_ids)
+    agent_ids = set(agents.values_list('id', flat=True))
+    if not agent_ids:
+        return
+
+    last_end_by_agent = _active_leave_ends(agent_ids, today)
+    next_start_by_agent = dict(
+        Record.objects.filter(agent_id__in=agent_ids, fecha_inicio__gt=today)
+        .values('agent_id')
+        .annotate(next_start=Min('fecha_inicio'))
+        .values_list('agent_id', 'next_start')
+    )
+    calendar = business_days.get_calendar(today, *last_end_by_agent.values())
+
+    snapshots = []
+    for agent_id in agent_ids:
+        last_end = last_end_by_agent.get(agent_id)
+        next_start = next_start_by_agent.get(agent_id)
+        if last_end is None and next_start is None:
+            continue
+        snapshots.append(AgentStatus(
+            agent_id=agent_id,
+            on_leave=last_end is not None,
+            leave_end=last_end,
+            return_date=calendar.next_working_day(last_end) if last_end else None,
+            next_leave_start=next_start,
+            computed_on=today,
+        ))
+
+    # Los agentes sin licencias activas ni futuras no necesitan fila
+    empty_ids = agent_ids - {snapshot.agent_id for snapshot in snapshots}
+    AgentStatus.objects.filter(agent_id__in=empty_ids).delete()
+    AgentStatus.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['agent'],
+        update_fields=['on_leave', 'leave_end', 'return_date', 'next_leave_start', 'computed_on'],
+    )
+
+
+def rollover_snapshots(today=None):
+    """
+    Actualiza las filas cuyo estado cambia al comenzar `today` y las que no
+    tienen fecha de reintegro (las carga así la migración 0008).
+    """
+    today = today or date.today()
+    stale = AgentStatus.objects.filter(computed_on__lt=today)
+    changed_ids = list(stale.filter(
+        Q(on_leave=True, leave_end__lt=today)
+        | Q(next_leave_start__lte=today)
+        | Q(on_leave=True, return_date__isnull=True)
+    ).values_list('agent_id', flat=True))
+    refresh_snapshots(changed_ids, today)
+    stale.update(computed_on=today)
+    return len(changed_ids)
+
+
+def _ensure_rolled_over(today):
+    global _rolled_over_on
+    if _rolled_over_on == today:
+        return
+    if AgentStatus.objects.filter(computed_on__lt=today).exists():
+        rollover_snapshots(today)
+    _rolled_over_on = today
+
+
+STATUS_FIELDS = ('agent_id', 'on_leave', 'return_date', 'next_leave_start')
+
+
+def _statuses_from_rows(rows):
+    return {
+        agent_id: {
+            'available': not on_leave,
+            'return_date': return_date,
+            'next_leave_start': next_leave_start,
+        }
+        for agent_id, on_leave, return_date, next_leave_start in rows
+    }
+
+
+def current_statuses(agent_ids=None, today=None):
+    """
+    Estado de disponibilidad leído de AgentStatus: {agent_id: {'available',
+    'return_date', 'next_leave_start'}} solo con los agentes que tienen fila
+    (ver `status_for`).
+    """
+    today = today or date.today()
+    _ensure_rolled_over(today)
+    snapshots = AgentStatus.objects.all()
+    if agent_ids is not None:
+        snapshots = snapshots.filter(agent_id__in=agent_ids)
+    return _statuses_from_rows(snapshots.values_list(*STATUS_FIELDS))
+
+
+async def acurrent_statuses(agent_ids=None, today=None):
+    """Versión async de `current_statuses` (para las vistas async)."""
+    today = today or date.today()
+    if _rolled_over_on != today:
+        await sync_to_async(_ensure_rolled_over)(today)
+    snapshots = AgentStatus.objects.all()
+    if agent_ids is not None:
+        snapshots = snapshots.filter(agent_id__in=agent_ids)
+    return _statuses_from_rows([row async for row in snapshots.values_list(*STATUS_FIELDS)])
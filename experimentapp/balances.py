@@ -0,0 +1,127 @@
+"""
+Días hábiles de licencia usados por agente, año y tipo.
+
+Se calcula para todos los agentes a la vez con una sola consulta ordenada por
+(agente, tipo, fecha de inicio). Los registros superpuestos de un mismo agente
+y tipo se unen en un barrido (un día no se cuenta dos veces), cada intervalo
+se recorta a los límites de cada año y los días hábiles (lunes a viernes, sin
+feriados de `holidays.AR`) se cuentan con búsqueda binaria sobre el calendario
+compartido de business_days, sin recorrer día por día. El total de cada
+agente sale de la unión de los intervalos de todos los tipos: un día con dos
+licencias superpuestas de distinto tipo cuenta en cada tipo, pero una sola
+vez en el total.
+
+El resultado se guarda en caché hasta el próximo cambio de datos.
+"""
+from collections import defaultdict
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+
+from . import business_days, cache
+from .models import Agent, Record
+
+RECORD_TYPE_CODES = [code for code, _ in Record.RECORD_TYPES]
+# Clave de working_days_used para los días de licencia de cualquier tipo
+ANY_TYPE = None
+
+
+def year_slices(start, end):
+    """Divide [start, end] en tramos que no cruzan el fin de año: (año, inicio, fin)."""
+    for year in range(start.year, end.year + 1):
+        yield year, max(start, date(year, 1, 1)), min(end, date(year, 12, 31))
+
+
+def union(intervals):
+    """Une intervalos (inicio, fin) superpuestos o contiguos, ordenados por inicio."""
+    current = None
+    for start, end in intervals:
+        if current is not None and start.toordinal() <= current[1].toordinal() + 1:
+            if end > current[1]:
+                current[1] = end
+            continue
+        if current is not None:
+            yield tuple(current)
+        current = [start, end]
+    if current is not None:
+        yield tuple(current)
+
+
+def merged_intervals(records):
+    """
+    Une los intervalos superpuestos o contiguos de cada (agente, tipo).
+    Genera tuplas (agent_id, record_type, inicio, fin).
+    """
+    rows = (
+        records.order_by('agent_id', 'record_type', 'fecha_inicio')
+        .values_list('agent_id', 'record_type', 'fecha_inicio', 'fecha_fin')
+        .iterator(chunk_size=2000)
+    )
+    for (agent_id, record_type), group in groupby(rows, key=itemgetter(0, 1)):
+        for start, end in union((start, end) for _, _, start, end in group):
+            yield agent_id, record_type, start, end
+
+
+def working_days_used(first_year, last_year):
+    """
+    Días hábiles de licencia por (agent_id, año, tipo) entre `first_year` y
+    `last_year` inclusive, y por (agent_id, año, ANY_TYPE) los días con
+    licencia de cualquier tipo. Los registros que cruzan el fin de año se
+    reparten entre ambos años.
+    """
+    first_day = date(first_year, 1, 1)
+    last_day = date(last_year, 12, 31)
+    calendar = business_days.get_calendar(first_day, last_day)
+    records = Record.objects.filter(fecha_inicio__lte=last_day, fecha_fin__gte=first_day)
+
+    used = defaultdict(int)
+
+    def count(agent_id, record_type, start, end):
+        for year, slice_start, slice_end in year_slices(max(start, first_day), min(end, last_day)):
+            days = calendar.count_working_days(slice_start, slice_end)
+            if days:
+                used[agent_id, year, record_type] += days
+
+    # merged_intervals viene ordenado por agente: se agrupa para calcular la unión
+    for agent_id, intervals in groupby(merged_intervals(records), key=itemgetter(0)):
+        intervals = list(intervals)
+        for _, record_type, start, end in intervals:
+            count(agent_id, record_type, start, end)
+        for start, end in union(sorted((start, end) for _, _, start, end in intervals)):
+            count(agent_id, ANY_TYPE, start, end)
+    return dict(used)
+
+
+def _compute_year_balances(year):
+    used = working_days_used(year, year)
+    agent_ids = {agent_id for agent_id, _, _ in used}
+    # Agentes activos (aunque no tengan licencias) y los dados de baja con licencias en el año
+    agents = Agent.objects.filter(active=True) | Agent.objects.filter(id__in=agent_ids)
+
+    rows = []
+    for agent_id, name, location, active in agents.order_by('name').values_list(
+        'id', 'name', 'location', 'active'
+    ):
+        days = {code: used.get((agent_id, year, code), 0) for code in RECORD_TYPE_CODES}
+        rows.append({
+            'agent_id': agent_id,
+            'name': name,
+            'location': location,
+            'active': active,
+            'days': days,
+            'total': used.get((agent_id, year, ANY_TYPE), 0),
+        })
+    return rows
+
+
+def year_balances(year):
+    """
+    Días hábiles usados en `year` por cada agente y tipo de licencia.
+
+    Retorna una lista (ordenada por nombre) de diccionarios con agent_id,
+    name, location, active, days ({tipo: días}) y total (días hábiles con
+    alguna licencia; no es la suma de los tipos si hay superposiciones).
+    """
+    return cache.cached_for_data_version(
+        'year_balances', lambda: _compute_year_balances(year), year
+    )
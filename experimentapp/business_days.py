@@ -0,0 +1,164 @@
+"""
+Calendario de días hábiles compartido por todo el proceso.
+
+Los feriados de Argentina (`holidays.AR`) y la lista ordenada de días hábiles
+se calculan una sola vez por worker para un rango de años configurable
+(settings.BUSINESS_CALENDAR_YEARS_BACK / BUSINESS_CALENDAR_YEARS_AHEAD).
+Las consultas usan búsqueda binaria sobre ordinales de fecha, por lo que
+"siguiente día hábil", "días hábiles entre A y B" y "¿es hábil?" son O(log n).
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+import holidays
+from django.conf import settings
+
+
+class BusinessCalendar:
+    """Días hábiles (lun-vie, sin feriados) entre `first_year` y `last_year`."""
+
+    def __init__(self, first_year, last_year):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.first_ordinal = date(first_year, 1, 1).toordinal()
+        self.last_ordinal = date(last_year, 12, 31).toordinal()
+
+        ar_holidays = holidays.AR(years=range(first_year, last_year + 1))
+        self.holiday_names = dict(ar_holidays)
+        # Lista ordenada de feriados para recortar por rango con bisect
+        self.holiday_dates = sorted(self.holiday_names)
+        self._holiday_ordinals = [d.toordinal() for d in self.holiday_dates]
+
+        holiday_ordinals = set(self._holiday_ordinals)
+        # date(1, 1, 1) (ordinal 1) es lunes, así que (ordinal - 1) % 7 == weekday()
+        self.working_days = [
+            ordinal
+            for ordinal in range(self.first_ordinal, self.last_ordinal + 1)
+            if (ordinal - 1) % 7 < 5 and ordinal not in holiday_ordinals
+        ]
+
+    def covers(self, day):
+        return self.first_ordinal <= day.toordinal() <= self.last_ordinal
+
+    def is_working_day(self, day):
+        ordinal = day.toordinal()
+        index = bisect_left(self.working_days, ordinal)
+        return index < len(self.working_days) and self.working_days[index] == ordinal
+
+    def next_working_day(self, day):
+        """Primer día hábil estrictamente posterior a `day` (o None si excede el rango)."""
+        index = bisect_right(self.working_days, day.toordinal())
+        if index >= len(self.working_days):
+            return None
+        return date.fromordinal(self.working_days[index])
+
+    def count_working_days(self, start, end):
+        """Cantidad de días hábiles en el intervalo cerrado [start, end]."""
+        if end < start:
+            return 0
+        return (
+            bisect_right(self.working_days, end.toordinal())
+            - bisect_left(self.working_days, start.toordinal())
+        )
+
+    def working_ordinals_between(self, start, end):
+        """Ordinales de los días hábiles en [start, end] (porción de la lista ordenada)."""
+        lo = bisect_left(self.working_days, start.toordinal())
+        hi = bisect_right(self.working_days, end.toordinal())
+        return self.working_days[lo:hi]
+
+    def holidays_between(self, start, end):
+        """Feriados en [start, end] como lista de (fecha, nombre)."""
+        lo = bisect_left(self._holiday_ordinals, start.toordinal())
+        hi = bisect_right(self._holiday_ordinals, end.toordinal())
+        return [(d, self.holiday_names[d]) for d in self.holiday_dates[lo:hi]]
+
+
+def weekday_runs(start, end):
+    """
+    Divide [start, end] en tramos de lunes a viernes consecutivos.
+    Genera tuplas (primer_día, último_día); O(semanas), no O(días).
+    """
+    current = start
+    while current <= end:
+        weekday = current.weekday()
+        if weekday >= 5:
+            current += timedelta(days=7 - weekday)
+            continue
+        friday = current + timedelta(days=4 - weekday)
+        last = min(friday, end)
+        yield current, last
+        current = friday + timedelta(days=3)
+
+
+# Años que puede abarcar un calendario: fechas fuera de este rango (por
+# ejemplo, que llegan del query string) no lo amplían
+MIN_YEAR = 1900
+MAX_YEAR = 2100
+# Calendarios distintos que se guardan por proceso
+MAX_CALENDARS = 4
+
+_lock = threading.Lock()
+_calendars = {}
+
+
+def _default_span():
+    current_year = date.today().year
+    years_back = getattr(settings, 'BUSINESS_CALENDAR_YEARS_BACK', 5)
+    years_ahead = getattr(settings, 'BUSINESS_CALENDAR_YEARS_AHEAD', 2)
+    return current_year - years_back, current_year + years_ahead
+
+
+def get_calendar(*days):
+    """
+    Devuelve el calendario memoizado que cubre el rango por defecto y,
+    si hace falta, las fechas recibidas (se amplía por año completo, dentro
+    de MIN_YEAR..MAX_YEAR; fuera de ese rango no hay días hábiles).
+    """
+    first_year, last_year = _default_span()
+    for day in days:
+        first_year = min(first_year, max(day.year, MIN_YEAR))
+        # Un año extra para que "siguiente día hábil" no caiga fuera del rango
+        last_year = max(last_year, min(day.year + 1, MAX_YEAR))
+
+    calendar = _covering_calendar(first_year, last_year)
+    if calendar is None:
+        with _lock:
+            calendar = _covering_calendar(first_year, last_year)
+            if calendar is None:
+                calendar = BusinessCalendar(first_year, last_year)
+                if len(_calendars) >= MAX_CALENDARS:
+                    # Se descarta el más antiguo
+                    del _calendars[next(iter(_calendars))]
+                _calendars[first_year, last_year] = calendar
+    return calendar
+
+
+def _covering_calendar(first_year, last_year):
+    """Algún calendario guardado que ya incluya [first_year, last_year]."""
+    for (cached_first, cached_last), calendar in list(_calendars.items()):
+        if cached_first <= first_year and last_year <= cached_last:
+            return calendar
+    return None
+
+
+def warm():
+    """Construye el calendario por defecto (una vez por worker)."""
+    return get_calendar()
+
+
+def is_working_day(day):
+    return get_calendar(day).is_working_day(day)
+
+
+def next_working_day(day):
+    return get_calendar(day).next_working_day(day)
+
+
+def count_working_days(start, end):
+    return get_calendar(start, end).count_working_days(start, end)
+
+
+def holidays_between(start, end):
+    return get_calendar(start, end).holidays_between(start, end)
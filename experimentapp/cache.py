@@ -0,0 +1,183 @@
+"""
+Caché de vistas invalidada por escritura.
+
+Todas las claves incluyen un contador de versión de datos que se incrementa
+(después del commit) cada vez que se guarda o borra un Agent, Record o User
+(ver signals.py). Así no hace falta borrar claves: al cambiar la versión las
+respuestas anteriores dejan de usarse y expiran solas.
+
+Los fragmentos de template que solo dependen de la lista de agentes (selector
+de agentes, tabla de agentes) usan además `agents_version`, que cambia solo
+al guardar o borrar agentes, y sobreviven a los cambios de registros.
+
+Funciona con cualquier backend de Django (locmem, archivos, Redis); con varios
+workers conviene uno compartido (archivos o Redis) para que todos vean la
+misma versión. `cache_per_role` acepta también vistas async (modo ASGI).
+"""
+import hashlib
+from asyncio import iscoroutinefunction
+import time
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+DATA_VERSION_KEY = 'sia:data_version'
+AGENTS_VERSION_KEY = 'sia:agents_version'
+RECORD_DELETIONS_KEY = 'sia:record_deletions'
+# Encabezados de la respuesta que se guardan junto con el contenido
+CACHED_HEADERS = ('X-Next-Url',)
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # Valor inicial único: si la clave se pierde no se reutilizan versiones viejas
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def data_version():
+    return _version(DATA_VERSION_KEY)
+
+
+def agents_version():
+    return _version(AGENTS_VERSION_KEY)
+
+
+async def adata_version():
+    version = await cache.aget(DATA_VERSION_KEY)
+    if version is None:
+        await cache.aadd(DATA_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(DATA_VERSION_KEY)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_data_version():
+    """Invalida todas las respuestas cacheadas cuando se confirme la transacción."""
+    transaction.on_commit(lambda: _bump(DATA_VERSION_KEY))
+
+
+def bump_agents_version():
+    """Invalida los fragmentos que dependen de la lista de agentes (tras el commit)."""
+    transaction.on_commit(lambda: _bump(AGENTS_VERSION_KEY))
+
+
+def record_deletions():
+    return _version(RECORD_DELETIONS_KEY)
+
+
+def bump_record_deletions():
+    """Avisa a los índices en memoria (ver absences.py) que se borraron registros."""
+    transaction.on_commit(lambda: _bump(RECORD_DELETIONS_KEY))
+
+
+def fingerprint(value):
+    """Resumen corto de `value` para usar en claves de caché."""
+    return hashlib.md5(repr(value).encode()).hexdigest()
+
+
+def cached_for_data_version(name, compute, *parts):
+    """
+    Resultado de `compute()` guardado hasta el próximo cambio de datos (la
+    clave incluye la versión de datos). Para cálculos compartidos por varias
+    vistas, como los saldos de licencias.
+    """
+    key = f'sia:data:{name}:{data_version()}:{fingerprint(parts)}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, settings.VIEW_CACHE_TIMEOUT)
+    return value
+
+
+def user_role(user):
+    if user.is_superuser:
+        return 'admin'
+    if user.is_staff:
+        return 'editor'
+    return 'lector'
+
+
+def response_cache_key(request, name, *parts, version=None, user=None):
+    raw = '|'.join([
+        str(data_version() if version is None else version),
+        date.today().isoformat(),  # estados y fecha del encabezado cambian a diario
+        user_role(user or request.user),
+        name,
+        *(str(part) for part in parts),
+        request.GET.urlencode(),
+    ])
+    return f'sia:view:{name}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _cached_response(cached):
+    content, content_type, headers = cached
+    response = HttpResponse(content, content_type=content_type)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _cacheable(response):
+    """Valor a guardar para `response`, o None si no se cachea."""
+    if response.status_code != 200 or response.streaming:
+        return None
+    headers = {h: response[h] for h in CACHED_HEADERS if response.has_header(h)}
+    return (response.content, response['Content-Type'], headers)
+
+
+def cache_per_role(view):
+    """
+    Cachea las respuestas GET exitosas de usuarios autenticados por versión
+    de datos, rol, argumentos de la URL y parámetros de la consulta.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if request.method != 'GET' or not user.is_authenticated:
+                return await view(request, *args, **kwargs)
+
+            key = response_cache_key(
+                request, view.__name__, *args, *sorted(kwargs.items()),
+                version=await adata_version(), user=user,
+            )
+            cached = await cache.aget(key)
+            if cached is not None:
+                return _cached_response(cached)
+
+            response = await view(request, *args, **kwargs)
+            value = _cacheable(response)
+            if value is not None:
+                await cache.aset(key, value, settings.VIEW_CACHE_TIMEOUT)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET' or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        key = response_cache_key(request, view.__name__, *args, *sorted(kwargs.items()))
+        cached = cache.get(key)
+        if cached is not None:
+            return _cached_response(cached)
+
+        response = view(request, *args, **kwargs)
+        value = _cacheable(response)
+        if value is not None:
+            cache.set(key, value, settings.VIEW_CACHE_TIMEOUT)
+        return response
+    return wrapper
@@ -0,0 +1,103 @@
+"""
+GET condicional (ETag / If-None-Match) para el calendario, los reportes y
+los listados.
+
+Cada vista declara una función barata que calcula su ETag (un agregado o la
+versión de datos de cache.py); si coincide con el If-None-Match del navegador
+se responde 304 sin ejecutar la vista, es decir, sin la consulta pesada ni la
+generación del Excel.
+
+Solo se envía ETag y no Last-Modified: el máximo de `updated_at` no cambia al
+borrar un registro, así que una revalidación por fecha podría devolver 304
+con datos viejos. Los ETag incluyen además la cantidad de registros.
+"""
+from asyncio import iscoroutinefunction
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from . import cache
+from .models import Agent
+
+
+def _etag(*parts):
+    return quote_etag(cache.fingerprint(parts))
+
+
+def records_etag(records, *parts):
+    """ETag de un conjunto de registros: cantidad y última modificación."""
+    stats = records.aggregate(count=Count('id'), last=Max('updated_at'))
+    return _etag(stats['count'], stats['last'], *parts)
+
+
+def agent_report_etag(request, agent_id):
+    row = (
+        Agent.objects.filter(id=agent_id)
+        .annotate(count=Count('records'), last=Max('records__updated_at'))
+        .values_list('name', 'count', 'last')
+        .first()
+    )
+    return None if row is None else _etag(agent_id, *row)
+
+
+def data_version_etag(request, *args, **kwargs):
+    """ETag de las vistas que dependen de todos los datos (reporte completo)."""
+    return _etag(cache.data_version(), request.get_full_path())
+
+
+def listing_etag(request, *args, **kwargs):
+    """ETag de los listados: mismos componentes que la clave de cache_per_role."""
+    if not request.user.is_authenticated:
+        return None
+    return _etag(
+        cache.data_version(),
+        date.today(),
+        cache.user_role(request.user),
+        request.get_full_path(),
+    )
+
+
+def _finish(response, etag):
+    if etag and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        # El navegador guarda la respuesta pero la revalida siempre (y no se
+        # comparte entre usuarios en proxies intermedios)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(etag_func):
+    """
+    Responde 304 si `etag_func(request, *args, **kwargs)` coincide con el
+    If-None-Match del request. Acepta vistas sync y async (en estas la
+    función se ejecuta con sync_to_async). Sin ETag (None) se ejecuta la vista.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                etag = None
+                if request.method in ('GET', 'HEAD'):
+                    etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+                response = get_conditional_response(request, etag=etag) if etag else None
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(response, etag)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = None
+            if request.method in ('GET', 'HEAD'):
+                etag = etag_func(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag) if etag else None
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish(response, etag)
+        return wrapper
+    return decorator
+
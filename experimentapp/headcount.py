@@ -0,0 +1,153 @@
+"""
+Ausencias diarias por ubicación y tipo de licencia (tablero de ocupación).
+
+Se arma a partir de una sola consulta con los registros que se superponen con
+el rango pedido. Con NumPy se construye una matriz tipo × agente × día: cada
+registro suma +1 en su primer día y -1 en el día siguiente al último (arreglo
+de diferencias), y la suma acumulada a lo largo de los días marca los días en
+que el agente está ausente. Los registros superpuestos de un mismo agente no
+se cuentan dos veces. Los fines de semana y feriados quedan en cero (se usa
+el calendario de business_days) y por último se suman las filas de agentes de
+cada ubicación. No hay bucles de Python por día ni por agente.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Count, Q
+
+from . import business_days
+from .models import Agent, Record
+
+# Rango máximo por consulta (un año completo, bisiesto incluido)
+MAX_DAYS = 366
+NO_LOCATION = 'Sin ubicación'
+RECORD_TYPE_CODES = [code for code, _ in Record.RECORD_TYPES]
+
+Headcount = namedtuple('Headcount', 'days working locations staff absent by_type record_types')
+
+
+def location_filter(location, prefix=''):
+    """Filtro por ubicación; NO_LOCATION selecciona a los agentes sin ubicación."""
+    if location == NO_LOCATION:
+        return Q(**{f'{prefix}location__isnull': True}) | Q(**{f'{prefix}location': ''})
+    return Q(**{f'{prefix}location': location})
+
+
+def working_day_mask(start, n_days):
+    """Arreglo booleano de `n_days` días desde `start`: True en los días hábiles."""
+    end = start + timedelta(days=n_days - 1)
+    calendar = business_days.get_calendar(start, end)
+    ordinals = np.asarray(calendar.working_ordinals_between(start, end), dtype=np.int64)
+    mask = np.zeros(n_days, dtype=bool)
+    mask[ordinals - start.toordinal()] = True
+    return mask
+
+
+def absence_matrix(type_index, agent_index, first_day, last_day, shape):
+    """
+    Matriz booleana `shape` = (tipos, agentes, días) con True en los días
+    cubiertos por algún intervalo. Los intervalos vienen como arreglos
+    paralelos de índices (días relativos al inicio, ya recortados al rango).
+    """
+    n_types, n_agents, n_days = shape
+    # Posición de cada fila (tipo, agente) en el arreglo aplanado de n_days + 1 columnas
+    row_offset = (type_index * n_agents + agent_index) * (n_days + 1)
+    size = n_types * n_agents * (n_days + 1)
+    diff = (
+        np.bincount(row_offset + first_day, minlength=size)
+        - np.bincount(row_offset + last_day + 1, minlength=size)
+    ).reshape(n_types, n_agents, n_days + 1)
+    return np.cumsum(diff[:, :, :-1], axis=2) > 0
+
+
+def _sum_by_group(matrix, group_index, n_groups):
+    """Suma las filas del eje 1 de `matrix` según el grupo de cada fila."""
+    order = np.argsort(group_index, kind='stable')
+    sorted_groups = group_index[order]
+    present = np.unique(sorted_groups)
+    starts = np.searchsorted(sorted_groups, present)
+
+    totals = np.zeros(matrix.shape[:1] + (n_groups,) + matrix.shape[2:], dtype=np.int32)
+    if len(order):
+        totals[:, present] = np.add.reduceat(
+            matrix[:, order].astype(np.int32), starts, axis=1
+        )
+    return totals
+
+
+def location_headcount(start, end, location=None, record_type=None):
+    """
+    Cantidad de agentes activos ausentes por ubicación y día en [start, end].
+
+    Retorna un `Headcount` con:
+    - days: fechas del rango; working: máscara de días hábiles,
+    - locations / staff: ubicaciones y cantidad de agentes activos de cada una,
+    - absent: arreglo (ubicaciones, días) de ausentes por cualquier tipo,
+    - by_type: arreglo (tipos, ubicaciones, días), en el orden de record_types.
+    """
+    n_days = (end - start).days + 1
+    record_types = [record_type] if record_type else RECORD_TYPE_CODES
+
+    agents = Agent.objects.filter(active=True)
+    if location:
+        agents = agents.filter(location_filter(location))
+    staff_rows = agents.values_list('location').annotate(count=Count('id')).order_by('location')
+    staff_by_location = {}
+    for agent_location, count in staff_rows:
+        # NULL y cadena vacía se agrupan como "Sin ubicación"
+        key = agent_location or NO_LOCATION
+        staff_by_location[key] = staff_by_location.get(key, 0) + count
+    locations = sorted(staff_by_location)
+    location_position = {name: i for i, name in enumerate(locations)}
+
+    records = Record.objects.filter(
+        agent__active=True, fecha_inicio__lte=end, fecha_fin__gte=start,
+    )
+    if location:
+        records = records.filter(location_filter(location, 'agent__'))
+    if record_type:
+        records = records.filter(record_type=record_type)
+    rows = list(
+        records.order_by()
+        .values_list('agent_id', 'agent__location', 'record_type', 'fecha_inicio', 'fecha_fin')
+    )
+
+    by_type = np.zeros((len(record_types), len(locations), n_days), dtype=np.int32)
+    absent = np.zeros((len(locations), n_days), dtype=np.int32)
+    working = working_day_mask(start, n_days)
+
+    if rows:
+        agent_ids, agent_locations, types, inicios, fines = zip(*rows)
+        agent_ids, agent_index = np.unique(np.asarray(agent_ids), return_inverse=True)
+        # Ubicación de cada agente (todas las filas de un agente tienen la misma)
+        agent_location_index = np.empty(len(agent_ids), dtype=np.int64)
+        agent_location_index[agent_index] = [
+            location_position[name or NO_LOCATION] for name in agent_locations
+        ]
+        type_position = {code: i for i, code in enumerate(record_types)}
+        type_index = np.fromiter((type_position[t] for t in types), dtype=np.int64, count=len(rows))
+
+        origin = start.toordinal()
+        first_day = np.fromiter((d.toordinal() for d in inicios), dtype=np.int64, count=len(rows)) - origin
+        last_day = np.fromiter((d.toordinal() for d in fines), dtype=np.int64, count=len(rows)) - origin
+        np.clip(first_day, 0, n_days - 1, out=first_day)
+        np.clip(last_day, 0, n_days - 1, out=last_day)
+
+        matrix = absence_matrix(
+            type_index, agent_index, first_day, last_day,
+            (len(record_types), len(agent_ids), n_days),
+        )
+        matrix &= working
+        by_type = _sum_by_group(matrix, agent_location_index, len(locations))
+        absent = _sum_by_group(matrix.any(axis=0)[np.newaxis], agent_location_index, len(locations))[0]
+
+    return Headcount(
+        days=[start + timedelta(days=i) for i in range(n_days)],
+        working=working,
+        locations=locations,
+        staff=[staff_by_location[name] for name in locations],
+        absent=absent,
+        by_type=by_type,
+        record_types=record_types,
+    )
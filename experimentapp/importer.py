@@ -0,0 +1,212 @@
+"""
+Importación masiva de registros desde Excel (.xlsx) o CSV.
+
+El archivo se lee como flujo (openpyxl en modo read-only o csv.reader), los
+nombres de agente se resuelven contra un mapa nombre -> id cargado una sola
+vez, y las filas válidas se insertan con `bulk_create` por lotes. Toda la
+importación es una sola transacción: las filas inválidas se saltean y se
+informan por número, pero si el archivo no se puede leer hasta el final o
+falla la base no queda guardado ningún lote.
+
+Columnas esperadas (mismas que los reportes Excel, se aceptan sin acentos):
+Agente, Tipo de Licencia, Fecha Inicio, Fecha Fin, Notas.
+"""
+import csv
+import io
+from datetime import date, datetime
+
+import openpyxl
+from django.db import transaction
+
+from . import availability, cache, search
+from .models import Agent, Record
+
+BATCH_SIZE = 1000
+
+COLUMN_ALIASES = {
+    'agent': ('agente', 'agent', 'nombre'),
+    'record_type': ('tipo de licencia', 'tipo', 'licencia', 'record_type'),
+    'fecha_inicio': ('fecha inicio', 'inicio', 'fecha_inicio', 'desde'),
+    'fecha_fin': ('fecha fin', 'fin', 'fecha_fin', 'hasta'),
+    'notes': ('notas', 'nota', 'notes'),
+}
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y')
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.rows = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+
+def _rows_from_xlsx(file):
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _rows_from_csv(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(text, dialect)
+
+
+def read_rows(file, filename):
+    """Filas del archivo como tuplas, según la extensión (.xlsx o .csv)."""
+    if filename.lower().endswith('.xlsx'):
+        return _rows_from_xlsx(file)
+    if filename.lower().endswith('.csv'):
+        return _rows_from_csv(file)
+    raise ValueError("Formato no soportado: use .xlsx o .csv")
+
+
+def _column_map(header):
+    normalized = [search.normalize(str(value or '')).strip() for value in header]
+    columns = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        for index, title in enumerate(normalized):
+            if title in aliases:
+                columns[key] = index
+                break
+    missing = {'agent', 'record_type', 'fecha_inicio'} - columns.keys()
+    if missing:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(sorted(missing))}")
+    return columns
+
+
+def _parse_date(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"fecha inválida '{value}'")
+
+
+class RecordImporter:
+    """Convierte filas en `Record` y las inserta por lotes."""
+
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        # Mapa nombre normalizado -> id (una sola consulta)
+        self.agent_ids = {
+            search.normalize(name).strip(): pk
+            for pk, name in Agent.objects.values_list('id', 'name')
+        }
+        self.record_types = {}
+        for value, label in Record.RECORD_TYPES:
+            self.record_types[value] = value
+            self.record_types[search.normalize(label)] = value
+
+    def _cell(self, row, columns, key):
+        index = columns.get(key)
+        if index is None or index >= len(row):
+            return None
+        return row[index]
+
+    def build_record(self, row, columns):
+        """Valida una fila y devuelve un `Record` sin guardar (o ValueError)."""
+        agent_name = str(self._cell(row, columns, 'agent') or '').strip()
+        agent_id = self.agent_ids.get(search.normalize(agent_name))
+        if agent_id is None:
+            raise ValueError(f"agente desconocido '{agent_name}'")
+
+        raw_type = str(self._cell(row, columns, 'record_type') or '').strip()
+        record_type = self.record_types.get(search.normalize(raw_type).replace(' ', '_')) \
+            or self.record_types.get(search.normalize(raw_type))
+        if record_type is None:
+            raise ValueError(f"tipo de licencia desconocido '{raw_type}'")
+
+        fecha_inicio = _parse_date(self._cell(row, columns, 'fecha_inicio'))
+        if fecha_inicio is None:
+            raise ValueError("falta la fecha de inicio")
+        fecha_fin = _parse_date(self._cell(row, columns, 'fecha_fin')) or fecha_inicio
+        if fecha_fin < fecha_inicio:
+            raise ValueError("la fecha de fin es anterior a la de inicio")
+
+        notes = self._cell(row, columns, 'notes')
+        notes = str(notes).strip() if notes not in (None, '', '-') else ''
+        return Record(
+            agent_id=agent_id,
+            record_type=record_type,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            notes=notes,
+        )
+
+    def _flush(self, batch, result, agent_ids):
+        if not batch:
+            return
+        if not self.dry_run:
+            created = Record.objects.bulk_create(batch)
+            # bulk_create no dispara señales: índice de búsqueda en la misma transacción
+            search.index_records(r for r in created if r.notes)
+            agent_ids.update(r.agent_id for r in created)
+        result.created += len(batch)
+
+    def run(self, rows):
+        """Importa `rows` (la primera es el encabezado) y devuelve un `ImportResult`."""
+        if self.dry_run:
+            return self._run(rows, set())
+        agent_ids = set()
+        with transaction.atomic():
+            result = self._run(rows, agent_ids)
+            if agent_ids:
+                # Estados y versión de datos, una vez y solo si se confirma
+                transaction.on_commit(lambda: availability.refresh_snapshots(agent_ids))
+                cache.bump_data_version()
+        return result
+
+    def _run(self, rows, agent_ids):
+        result = ImportResult()
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            result.add_error(1, "el archivo está vacío")
+            return result
+        try:
+            columns = _column_map(header)
+        except ValueError as e:
+            result.add_error(1, str(e))
+            return result
+
+        batch = []
+        for row_number, row in enumerate(rows, 2):
+            if not any(value not in (None, '') for value in row):
+                continue  # fila vacía
+            result.rows += 1
+            try:
+                batch.append(self.build_record(row, columns))
+            except ValueError as e:
+                result.add_error(row_number, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                self._flush(batch, result, agent_ids)
+                batch = []
+        self._flush(batch, result, agent_ids)
+        return result
+
+
+def import_records(file, filename, dry_run=False, batch_size=BATCH_SIZE):
+    """Importa registros desde `file` (binario). Devuelve un `ImportResult`."""
+    return RecordImporter(batch_size=batch_size, dry_run=dry_run).run(read_rows(file, filename))
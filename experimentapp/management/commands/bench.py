@@ -0,0 +1,279 @@
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from experimentapp import availability, search
+from experimentapp.models import Agent, Record
+from experimentapp.overlaps import overlapping_record_ids
+
+AGENT_PREFIX = 'Bench '
+BENCH_USERNAME = 'bench'
+
+# Distribuciones aproximadas a las de los datos reales
+LOCATIONS = (
+    ('CONCESIONES - CENTRAL', 30),
+    ('CONCESIONES - SUPERVISIÓN - TRAMO I', 8),
+    ('CONCESIONES - SUPERVISIÓN - TRAMO V', 8),
+    ('CONCESIONES - SUPERVISIÓN - ACCESO OESTE', 8),
+    ('CONCESIONES - SUPERVISIÓN - ACCESO NORTE', 8),
+    ('PLANEAMIENTO - DEMANDA', 6),
+    ('PLANEAMIENTO - PROGRAMAS Y PRESTAMOS EXTERNOS', 6),
+    (None, 2),
+)
+RECORD_TYPE_WEIGHTS = (
+    ('vacaciones', 40),
+    ('franquicia', 25),
+    ('razon_particular', 25),
+    ('comision', 10),
+)
+# Duración en días corridos (inclusive) por tipo de licencia
+DURATIONS = {
+    'vacaciones': (7, 10, 14, 14, 21),
+    'franquicia': (1, 1, 2, 3),
+    'razon_particular': (1,),
+    'comision': (1, 2, 3, 5),
+}
+NOTES = ('Certificado presentado', 'Pendiente de firma', 'Viaje a obra', 'Trámite personal')
+NOTES_RATE = 0.1
+# Fracción de registros que se superponen a propósito con el anterior
+OVERLAP_RATE = 0.01
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga datos sintéticos deterministas y mide las rutas principales '
+        '(listados, calendario, ocupación, exports, estado de agentes, duplicados). '
+        'Usar una base aparte, por ejemplo DATABASE_URL=sqlite:///bench.sqlite3'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=1000,
+                            help='Cantidad de agentes sintéticos (default: 1000)')
+        parser.add_argument('--records', type=int, default=1000000,
+                            help='Cantidad de registros sintéticos (default: 1000000)')
+        parser.add_argument('--years', type=int, default=10,
+                            help='Años hacia atrás que cubren los registros (default: 10)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Semilla del generador (default: 42)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Registros por bulk_create (default: 5000)')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Ejecuciones por medición (default: 5)')
+        parser.add_argument('--export-repeat', type=int, default=1,
+                            help='Ejecuciones de los exports Excel completos (default: 1)')
+        parser.add_argument('--skip-seed', action='store_true',
+                            help='No cargar datos: medir sobre los datos existentes')
+        parser.add_argument('--output',
+                            help='Archivo JSON de resultados (default: bench-<fecha>.json)')
+
+    # --- Datos sintéticos ----------------------------------------------------
+
+    def seed(self, options):
+        bench_agents = Agent.objects.filter(name__startswith=AGENT_PREFIX)
+        if bench_agents.exists():
+            if (bench_agents.count() == options['agents']
+                    and Record.objects.count() == options['records']):
+                self.stdout.write('Datos de benchmark ya cargados, se reutilizan.')
+                return
+            raise CommandError(
+                'La base ya tiene datos de benchmark de otro tamaño: usar una base nueva.'
+            )
+        if Agent.objects.exists():
+            raise CommandError(
+                'La base tiene datos reales: usar una base aparte (DATABASE_URL) o --skip-seed.'
+            )
+
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        Agent.objects.bulk_create(
+            [
+                Agent(name=f'{AGENT_PREFIX}{number:05d}', location=_weighted(rng, LOCATIONS))
+                for number in range(1, options['agents'] + 1)
+            ],
+            batch_size=options['chunk_size'],
+        )
+        agent_ids = list(bench_agents.order_by('id').values_list('id', flat=True))
+
+        batch = []
+        created = 0
+        for record in self.generate_records(rng, agent_ids, options):
+            batch.append(record)
+            if len(batch) >= options['chunk_size']:
+                created += self.flush(batch)
+                batch = []
+                self.stdout.write(f'\r{created} registros', ending='')
+        created += self.flush(batch)
+        self.stdout.write(f'\r{created} registros')
+
+        # bulk_create no dispara señales: índice de búsqueda y estados en bloque
+        search.rebuild()
+        availability.refresh_snapshots()
+        self.stdout.write(self.style.SUCCESS(
+            f'Carga: {len(agent_ids)} agentes, {created} registros '
+            f'en {time.perf_counter() - started:.1f} s'
+        ))
+
+    def generate_records(self, rng, agent_ids, options):
+        """Registros ordenados por agente y fecha, repartidos en el período."""
+        today = date.today()
+        # (el 29/2 no existe en todos los años)
+        first_day = date(today.year - options['years'], today.month, min(today.day, 28))
+        span = (today + timedelta(days=90) - first_day).days
+        per_agent, remainder = divmod(options['records'], len(agent_ids))
+
+        for index, agent_id in enumerate(agent_ids):
+            count = per_agent + (1 if index < remainder else 0)
+            step = span / max(count, 1)
+            previous_start = None
+            for number in range(count):
+                record_type = _weighted(rng, RECORD_TYPE_WEIGHTS)
+                start = first_day + timedelta(days=int(number * step + rng.random() * step / 2))
+                if previous_start and rng.random() < OVERLAP_RATE:
+                    start = previous_start + timedelta(days=1)
+                previous_start = start
+                yield Record(
+                    agent_id=agent_id,
+                    record_type=record_type,
+                    fecha_inicio=start,
+                    fecha_fin=start + timedelta(days=rng.choice(DURATIONS[record_type]) - 1),
+                    notes=rng.choice(NOTES) if rng.random() < NOTES_RATE else '',
+                )
+
+    def flush(self, batch):
+        with transaction.atomic():
+            Record.objects.bulk_create(batch)
+        return len(batch)
+
+    # --- Mediciones ----------------------------------------------------------
+
+    def measure(self, name, func, repeat):
+        timings = []
+        queries = 0
+        size = None
+        for _ in range(max(repeat, 1)):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                result = func()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = len(captured)
+            if size is None and isinstance(result, int):
+                size = result
+
+        result = {
+            'name': name,
+            'runs': len(timings),
+            'min_ms': round(min(timings), 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': queries,
+            'size': size,
+        }
+        self.stdout.write(
+            f"{name:<40} min {result['min_ms']:>10.2f} ms  mediana {result['median_ms']:>10.2f} ms"
+            f"  {queries:>4} consultas"
+        )
+        return result
+
+    def get(self, client, url):
+        def request():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: respuesta {response.status_code}')
+            # Los exports se generan al consumir el contenido
+            if response.streaming:
+                return sum(len(chunk) for chunk in response.streaming_content)
+            return len(response.content)
+        return request
+
+    def cases(self, client, options):
+        repeat = options['repeat']
+        # Agente con más registros: el peor caso del calendario y su reporte
+        agent_id = (
+            Record.objects.values('agent_id').order_by()
+            .annotate(total=Count('id'))
+            .order_by('-total').values_list('agent_id', flat=True).first()
+        )
+        if agent_id is None:
+            raise CommandError('No hay registros para medir.')
+        month_start = date.today().replace(day=1)
+        calendar_range = (
+            f'?start={month_start - timedelta(days=7)}&end={month_start + timedelta(days=42)}'
+        )
+        home = reverse('home')
+
+        return [
+            ('home asistencia (sin filtros)', self.get(client, home), repeat),
+            ('home asistencia (todos)', self.get(client, f'{home}?agent=all'), repeat),
+            ('home asistencia (tipo)', self.get(client, f'{home}?type=vacaciones'), repeat),
+            ('home asistencia (búsqueda)', self.get(client, f'{home}?search=firma'), repeat),
+            ('home asistencia (duplicados)', self.get(client, f'{home}?duplicates=true'), repeat),
+            ('home agentes', self.get(client, f'{home}?view=agentes'), repeat),
+            ('home de licencia', self.get(client, f'{home}?view=de_licencia'), repeat),
+            ('agent_calendar_data',
+             self.get(client, reverse('agent_calendar_data', args=[agent_id]) + calendar_range), repeat),
+            ('headcount_data (último año)',
+             self.get(client, reverse('headcount_data') + f'?from={date.today() - timedelta(days=365)}&to={date.today()}'),
+             repeat),
+            ('export_agent_report',
+             self.get(client, reverse('export_agent_report', args=[agent_id])), repeat),
+            ('export_full_report',
+             self.get(client, reverse('export_full_report')), options['export_repeat']),
+            # Estado de disponibilidad: lectura de AgentStatus (vistas) y recálculo completo
+            ('current_statuses', lambda: len(availability.current_statuses()), repeat),
+            ('refresh_snapshots', availability.refresh_snapshots, repeat),
+            ('duplicados (overlapping_record_ids)',
+             lambda: len(list(overlapping_record_ids())), repeat),
+        ]
+
+    def handle(self, *args, **options):
+        if not options['skip_seed']:
+            self.seed(options)
+
+        user, _ = User.objects.get_or_create(
+            username=BENCH_USERNAME, defaults={'is_superuser': True, 'is_staff': True}
+        )
+        results = []
+        # Sin caché de vistas (se mide el trabajo real) ni log por request
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            ALLOWED_HOSTS=['testserver'],
+            PERFORMANCE_SAMPLE_RATE=0.0,
+            NPLUSONE_MODE='off',
+        ):
+            client = Client()
+            client.force_login(user)
+            for name, func, repeat in self.cases(client, options):
+                results.append(self.measure(name, func, repeat))
+
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'vendor': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'seed': options['seed'],
+            'agents': Agent.objects.count(),
+            'records': Record.objects.count(),
+            'results': results,
+        }
+        output = options['output'] or f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Resultados guardados en {output}'))
@@ -0,0 +1,63 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from experimentapp.models import Agent, Record
+
+
+class Command(BaseCommand):
+    help = 'Muestra el plan de ejecución (EXPLAIN) y el tiempo de las consultas principales de las vistas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Cantidad de ejecuciones por consulta para medir el tiempo (default: 5)')
+        parser.add_argument('--analyze', action='store_true',
+                            help='En PostgreSQL usa EXPLAIN ANALYZE (ejecuta la consulta)')
+
+    def get_queries(self):
+        today = date.today()
+        window_start = today.replace(day=1)
+        window_end = window_start + timedelta(days=41)
+        agent_id = Agent.objects.values_list('id', flat=True).first() or 0
+
+        return [
+            ('Estado de agentes (registros activos hoy)',
+             Record.objects.filter(fecha_inicio__lte=today, fecha_fin__gte=today)
+             .values('agent_id').order_by()),
+            ('Calendario de un agente (ventana visible)',
+             Record.objects.filter(agent_id=agent_id, fecha_inicio__lte=window_end, fecha_fin__gte=window_start)),
+            ('Reporte de un agente',
+             Record.objects.filter(agent_id=agent_id).order_by('fecha_inicio')),
+            ('Listado filtrado por tipo',
+             Record.objects.filter(record_type='vacaciones').order_by('-fecha_inicio')[:100]),
+            ('Listado por defecto (-fecha_inicio)',
+             Record.objects.order_by('-fecha_inicio')[:100]),
+        ]
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        explain_options = {}
+        if options['analyze'] and vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Motor: {vendor} - {Record.objects.count()} registros, {Agent.objects.count()} agentes'
+        ))
+
+        for title, queryset in self.get_queries():
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+
+            timings = []
+            for _ in range(max(options['repeat'], 1)):
+                started = time.perf_counter()
+                list(queryset)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'Tiempo: min {timings[0]:.2f} ms, mediana {timings[len(timings) // 2]:.2f} ms'
+            )
@@ -0,0 +1,28 @@
+from datetime import date
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from experimentapp.reports import agent_bundle_records, write_agent_bundle
+
+
+class Command(BaseCommand):
+    help = 'Genera un ZIP con el reporte Excel de cada agente activo (por ejemplo, para el cierre de mes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='reportes_por_agente.zip',
+                            help='Archivo ZIP a generar')
+        parser.add_argument('--location', help='Solo agentes de esta ubicación')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help='Registros que terminan desde esta fecha (aaaa-mm-dd)')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Registros que empiezan hasta esta fecha (aaaa-mm-dd)')
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        records = agent_bundle_records(options['location'], options['date_from'], options['date_to'])
+        count = write_agent_bundle(records, options['output'])
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} reportes guardados en {options['output']} ({elapsed:.1f} s)."
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from experimentapp.importer import BATCH_SIZE, import_records
+
+
+class Command(BaseCommand):
+    help = 'Importa registros de licencias desde un archivo .xlsx o .csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Ruta al archivo .xlsx o .csv')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Registros por lote de inserción (default: {BATCH_SIZE})')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Valida el archivo sin guardar registros')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, 'rb') as file:
+                result = import_records(
+                    file, path, dry_run=options['dry_run'], batch_size=options['batch_size']
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for row_number, message in result.errors:
+            self.stderr.write(f'Fila {row_number}: {message}')
+
+        action = 'validados' if options['dry_run'] else 'importados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} de {result.rows} registros {action} ({len(result.errors)} errores).'
+        ))
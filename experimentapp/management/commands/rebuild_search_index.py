@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from experimentapp import search
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice de búsqueda de agentes y notas (SQLite / FTS5)'
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda regenerado.'))
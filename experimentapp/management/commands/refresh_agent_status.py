@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from experimentapp import availability
+
+
+class Command(BaseCommand):
+    help = 'Actualiza el estado precalculado de los agentes al cambiar el día (ejecutar a diario, después de medianoche)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recalcula el estado de todos los agentes')
+
+    def handle(self, *args, **options):
+        if options['full']:
+            availability.refresh_snapshots()
+            self.stdout.write(self.style.SUCCESS('Estado de todos los agentes recalculado.'))
+            return
+
+        changed = availability.rollover_snapshots()
+        self.stdout.write(self.style.SUCCESS(f'Cambio de día aplicado: {changed} agentes actualizados.'))
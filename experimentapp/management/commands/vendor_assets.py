@@ -0,0 +1,59 @@
+import hashlib
+import os
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from experimentapp.assets import VENDOR_ASSETS, cdn_url, expected_sha256, static_path
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'static')
+
+
+class Command(BaseCommand):
+    help = ('Verifica el sha256 de las librerías de front-end versionadas (FullCalendar, flatpickr); '
+            'con --download las descarga del CDN')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--download', action='store_true',
+                            help='Descargar del CDN los archivos que falten (por ejemplo, al cambiar de versión)')
+        parser.add_argument('--force', action='store_true',
+                            help='Con --download, descargar aunque el archivo ya exista')
+
+    def handle(self, *args, **options):
+        errors = []
+        for name in VENDOR_ASSETS:
+            destination = os.path.normpath(os.path.join(STATIC_DIR, static_path(name)))
+            if options['download'] and (options['force'] or not os.path.exists(destination)):
+                self.download(name, destination)
+
+            if not os.path.exists(destination):
+                errors.append(f'{name}: falta {destination}')
+                continue
+            with open(destination, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            if digest != expected_sha256(name):
+                errors.append(f'{name}: sha256 {digest} distinto del fijado en assets.py')
+            else:
+                self.stdout.write(f'{name}: OK')
+
+        if errors:
+            raise CommandError('Librerías de front-end inválidas:\n' + '\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('Librerías verificadas.'))
+
+    def download(self, name, destination):
+        url = cdn_url(name)
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                content = response.read()
+        except OSError as e:
+            raise CommandError(f'No se pudo descargar {url}: {e}')
+
+        digest = hashlib.sha256(content).hexdigest()
+        if digest != expected_sha256(name):
+            # No se escribe nada que no coincida con el hash fijado
+            raise CommandError(f'{url}: sha256 {digest} distinto del fijado en assets.py')
+
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, 'wb') as f:
+            f.write(content)
+        self.stdout.write(f'{name}: descargado ({len(content) // 1024} KB)')
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experimentapp', '0004_alter_agent_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['agent', 'fecha_inicio', 'fecha_fin'], name='record_agent_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['record_type', 'fecha_inicio'], name='record_type_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['-fecha_inicio'], name='record_inicio_desc_idx'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+import unicodedata
+
+from django.db import migrations
+
+# Copia fija de lo que usa experimentapp.search: las migraciones no importan
+# código de la app, que puede cambiar después
+AGENT_TABLE = 'experimentapp_agent_search'
+RECORD_TABLE = 'experimentapp_record_search'
+BATCH_SIZE = 2000
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # unaccent() no es IMMUTABLE; el envoltorio permite usarla en índices
+    """
+    CREATE OR REPLACE FUNCTION experimentapp_unaccent(text) RETURNS text AS $$
+        SELECT public.unaccent('public.unaccent'::regdictionary, lower($1))
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    "CREATE INDEX IF NOT EXISTS agent_name_trgm_idx ON experimentapp_agent"
+    " USING gin (experimentapp_unaccent(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS agent_location_trgm_idx ON experimentapp_agent"
+    " USING gin (experimentapp_unaccent(location) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS record_notes_trgm_idx ON experimentapp_record"
+    " USING gin (experimentapp_unaccent(notes) gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS record_notes_trgm_idx",
+    "DROP INDEX IF EXISTS agent_location_trgm_idx",
+    "DROP INDEX IF EXISTS agent_name_trgm_idx",
+    "DROP FUNCTION IF EXISTS experimentapp_unaccent(text)",
+]
+
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {AGENT_TABLE} USING fts5(content, tokenize='trigram')",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {RECORD_TABLE} USING fts5(content, tokenize='trigram')",
+]
+
+SQLITE_BACKWARD = [
+    f"DROP TABLE IF EXISTS {RECORD_TABLE}",
+    f"DROP TABLE IF EXISTS {AGENT_TABLE}",
+]
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _insert_documents(cursor, table, rows):
+    batch = []
+    for pk, content in rows:
+        if content:
+            batch.append((pk, content))
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(f"INSERT INTO {table} (rowid, content) VALUES (%s, %s)", batch)
+            batch = []
+    cursor.executemany(f"INSERT INTO {table} (rowid, content) VALUES (%s, %s)", batch)
+
+
+def fill_sqlite_index(apps, schema_editor):
+    """Carga en las tablas FTS5 el texto normalizado de agentes y registros existentes."""
+    Agent = apps.get_model('experimentapp', 'Agent')
+    Record = apps.get_model('experimentapp', 'Record')
+    db_alias = schema_editor.connection.alias
+    agents = Agent.objects.using(db_alias).values_list('id', 'name', 'location').iterator(chunk_size=BATCH_SIZE)
+    records = (
+        Record.objects.using(db_alias)
+        .exclude(notes__isnull=True).exclude(notes='')
+        .values_list('id', 'notes')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        _insert_documents(cursor, AGENT_TABLE, (
+            (pk, normalize(f'{name} {location or ""}')) for pk, name, location in agents
+        ))
+        _insert_documents(cursor, RECORD_TABLE, ((pk, normalize(notes)) for pk, notes in records))
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif vendor == 'sqlite':
+        statements = SQLITE_FORWARD
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+    if vendor == 'sqlite':
+        fill_sqlite_index(apps, schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experimentapp', '0005_record_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experimentapp', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='active',
+            field=models.BooleanField(default=True, verbose_name='Activo'),
+        ),
+    ]
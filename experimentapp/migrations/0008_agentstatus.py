@@ -0,0 +1,67 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:44
+
+from datetime import date, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def build_snapshots(apps, schema_editor):
+    """
+    Carga AgentStatus para los agentes con licencias activas o futuras. La
+    fecha de reintegro necesita el calendario de días hábiles, que no está
+    disponible en la migración: queda vacía y computed_on de ayer, así que el
+    primer acceso (o refresh_agent_status) la completa al hacer el rollover.
+    """
+    Record = apps.get_model('experimentapp', 'Record')
+    AgentStatus = apps.get_model('experimentapp', 'AgentStatus')
+    db_alias = schema_editor.connection.alias
+    today = date.today()
+    records = Record.objects.using(db_alias)
+
+    last_end_by_agent = dict(
+        records.filter(fecha_inicio__lte=today, fecha_fin__gte=today)
+        .values('agent_id')
+        .annotate(last_end=Max('fecha_fin'))
+        .values_list('agent_id', 'last_end')
+    )
+    next_start_by_agent = dict(
+        records.filter(fecha_inicio__gt=today)
+        .values('agent_id')
+        .annotate(next_start=Min('fecha_inicio'))
+        .values_list('agent_id', 'next_start')
+    )
+    AgentStatus.objects.using(db_alias).bulk_create([
+        AgentStatus(
+            agent_id=agent_id,
+            on_leave=agent_id in last_end_by_agent,
+            leave_end=last_end_by_agent.get(agent_id),
+            next_leave_start=next_start_by_agent.get(agent_id),
+            computed_on=today - timedelta(days=1),
+        )
+        for agent_id in last_end_by_agent.keys() | next_start_by_agent.keys()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experimentapp', '0007_agent_active'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_leave', models.BooleanField(default=False)),
+                ('leave_end', models.DateField(blank=True, null=True)),
+                ('return_date', models.DateField(blank=True, null=True)),
+                ('next_leave_start', models.DateField(blank=True, null=True)),
+                ('computed_on', models.DateField()),
+                ('agent', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='status_snapshot', to='experimentapp.agent')),
+            ],
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
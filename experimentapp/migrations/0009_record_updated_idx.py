@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experimentapp', '0008_agentstatus'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['updated_at'], name='record_updated_idx'),
+        ),
+    ]
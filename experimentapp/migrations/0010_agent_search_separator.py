@@ -0,0 +1,52 @@
+import unicodedata
+
+from django.db import migrations
+
+# Copia fija de lo que usa experimentapp.search (ver 0006_search_index)
+AGENT_TABLE = 'experimentapp_agent_search'
+BATCH_SIZE = 2000
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _reindex_agents(apps, schema_editor, document):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Agent = apps.get_model('experimentapp', 'Agent')
+    agents = (
+        Agent.objects.using(schema_editor.connection.alias)
+        .values_list('id', 'name', 'location')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {AGENT_TABLE}")
+        batch = []
+        for pk, name, location in agents:
+            batch.append((pk, document(name, location)))
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(f"INSERT INTO {AGENT_TABLE} (rowid, content) VALUES (%s, %s)", batch)
+                batch = []
+        cursor.executemany(f"INSERT INTO {AGENT_TABLE} (rowid, content) VALUES (%s, %s)", batch)
+
+
+def separate_name_and_location(apps, schema_editor):
+    """Nombre y ubicación separados por un salto de línea, que las búsquedas no incluyen."""
+    _reindex_agents(apps, schema_editor, lambda name, location: f'{normalize(name)}\n{normalize(location)}')
+
+
+def join_name_and_location(apps, schema_editor):
+    _reindex_agents(apps, schema_editor, lambda name, location: normalize(f'{name} {location or ""}'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experimentapp', '0009_record_updated_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(separate_name_and_location, join_name_and_location),
+    ]
@@ -4,6 +4,8 @@ from django.contrib.auth.models import User
 class Agent(models.Model):
     name = models.CharField(max_length=100)
     location = models.CharField(max_length=255, blank=True, null=True, verbose_name="Ubicación")
+    # Agentes dados de baja: se conservan (con sus registros) pero no se listan
+    active = models.BooleanField(default=True, verbose_name="Activo")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -30,6 +32,31 @@ class Record(models.Model):
     
     class Meta:
         ordering = ['-fecha_inicio']
+        indexes = [
+            # Registros de un agente que se superponen con un rango de fechas
+            models.Index(fields=['agent', 'fecha_inicio', 'fecha_fin'], name='record_agent_dates_idx'),
+            # Filtro por tipo ordenado por fecha de inicio
+            models.Index(fields=['record_type', 'fecha_inicio'], name='record_type_inicio_idx'),
+            # Orden por defecto del listado
+            models.Index(fields=['-fecha_inicio'], name='record_inicio_desc_idx'),
+            # Registros modificados desde la última sincronización (absences.py)
+            models.Index(fields=['updated_at'], name='record_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.agent.name} - {self.record_type} ({self.fecha_inicio} to {self.fecha_fin})"
+
+class AgentStatus(models.Model):
+    """
+    Estado de disponibilidad precalculado de un agente. Se actualiza con las
+    señales de Record y con el cambio de día (ver availability.py).
+    """
+    agent = models.OneToOneField(Agent, on_delete=models.CASCADE, related_name='status_snapshot')
+    on_leave = models.BooleanField(default=False)
+    leave_end = models.DateField(blank=True, null=True)
+    return_date = models.DateField(blank=True, null=True)
+    next_leave_start = models.DateField(blank=True, null=True)
+    computed_on = models.DateField()
+
+    def __str__(self):
+        return f"{self.agent_id} - {'de licencia' if self.on_leave else 'disponible'} ({self.computed_on})"
@@ -0,0 +1,94 @@
+"""
+Detección de registros superpuestos (mismo agente y mismo tipo).
+
+Ordenando los registros de cada (agente, tipo) por fecha de inicio, un
+registro se superpone con otro si:
+- el siguiente registro empieza antes o el mismo día en que éste termina, o
+- alguno de los anteriores termina el día en que éste empieza o después.
+
+En la base de datos se resuelve con funciones de ventana (LEAD y MAX sobre
+la partición) en una sola pasada; en memoria, con un barrido que además
+agrupa los registros en clusters de superposición.
+"""
+from django.db.models import BooleanField, Case, F, Max, Value, When, Window
+from django.db.models.expressions import RowRange
+from django.db.models.functions import Lead
+
+from .models import Record
+
+
+def _partition():
+    return {
+        'partition_by': [F('agent_id'), F('record_type')],
+        'order_by': [F('fecha_inicio').asc(), F('id').asc()],
+    }
+
+
+def overlapping_record_ids(records=None):
+    """
+    Subconsulta con los ids de `records` que se superponen con otro registro
+    del mismo agente y tipo dentro de `records` (por defecto, toda la tabla).
+    """
+    if records is None:
+        records = Record.objects.all()
+    return (
+        records.order_by()
+        .annotate(
+            next_inicio=Window(Lead('fecha_inicio'), **_partition()),
+            prev_max_fin=Window(Max('fecha_fin'), frame=RowRange(start=None, end=-1), **_partition()),
+        )
+        .annotate(
+            has_overlap=Case(
+                When(next_inicio__lte=F('fecha_fin'), then=Value(True)),
+                When(prev_max_fin__gte=F('fecha_inicio'), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
+        .filter(has_overlap=True)
+        .values('id')
+    )
+
+
+def find_overlap_clusters(records=None):
+    """
+    Agrupa los registros superpuestos en clusters con un barrido por
+    (agente, tipo). Una sola consulta ordenada; O(n) en memoria.
+
+    Retorna una lista de diccionarios con agent_id, record_type, start, end
+    (extremos del cluster) y record_ids.
+    """
+    if records is None:
+        records = Record.objects.all()
+    rows = (
+        records.order_by('agent_id', 'record_type', 'fecha_inicio', 'id')
+        .values_list('id', 'agent_id', 'record_type', 'fecha_inicio', 'fecha_fin')
+        .iterator(chunk_size=2000)
+    )
+
+    clusters = []
+    current = None
+    for record_id, agent_id, record_type, fecha_inicio, fecha_fin in rows:
+        if (
+            current is not None
+            and current['agent_id'] == agent_id
+            and current['record_type'] == record_type
+            and fecha_inicio <= current['end']
+        ):
+            current['record_ids'].append(record_id)
+            current['end'] = max(current['end'], fecha_fin)
+            continue
+
+        if current is not None and len(current['record_ids']) > 1:
+            clusters.append(current)
+        current = {
+            'agent_id': agent_id,
+            'record_type': record_type,
+            'start': fecha_inicio,
+            'end': fecha_fin,
+            'record_ids': [record_id],
+        }
+
+    if current is not None and len(current['record_ids']) > 1:
+        clusters.append(current)
+    return clusters
@@ -0,0 +1,95 @@
+"""
+Paginación por cursor (keyset) del listado de asistencia.
+
+El orden es (columna elegida, id) y el cursor guarda los valores de la
+última fila enviada, así que la página siguiente se obtiene con
+`WHERE (columna, id) > (valor, id)` en vez de OFFSET: el costo no crece con
+el número de página y el resultado es estable aunque se inserten registros.
+"""
+import base64
+import binascii
+import json
+from datetime import date
+
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+
+DEFAULT_SORT = '-fecha_inicio'
+SORT_FIELDS = ('agent__name', 'agent__location', 'fecha_inicio', 'fecha_fin')
+DATE_FIELDS = ('fecha_inicio', 'fecha_fin')
+# Rango de los id (BigAutoField): un valor mayor haría fallar la consulta
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_sort(sort_by):
+    """Devuelve (campo, descendente) validando contra las columnas ordenables."""
+    sort_by = sort_by or DEFAULT_SORT
+    descending = sort_by.startswith('-')
+    field = sort_by.lstrip('-')
+    if field not in SORT_FIELDS:
+        return parse_sort(DEFAULT_SORT)
+    return field, descending
+
+
+def _sort_expression(field):
+    # La ubicación admite NULL; se ordena como cadena vacía para que el
+    # cursor pueda compararla con < / >.
+    if field == 'agent__location':
+        return Coalesce(F(field), Value(''))
+    return F(field)
+
+
+def encode_cursor(value, pk):
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([value, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _cursor_value(value, field):
+    """Valor del cursor convertido al tipo de `field`; ValueError si no corresponde."""
+    if not isinstance(value, str) or '\x00' in value:
+        # Fechas en ISO 8601 y textos: siempre cadenas (sin NUL, que PostgreSQL rechaza)
+        raise ValueError(f'Valor de cursor inválido para {field}')
+    if field in DATE_FIELDS:
+        return date.fromisoformat(value)
+    return value
+
+
+def decode_cursor(cursor, field):
+    """Devuelve (valor, id) o None si el cursor es inválido."""
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if type(pk) is not int or not 0 < pk <= MAX_ID:
+            return None
+        return _cursor_value(value, field), pk
+    except (binascii.Error, ValueError, TypeError, RecursionError):
+        return None
+
+
+def keyset_page(records, sort_by, cursor=None, page_size=100):
+    """
+    Devuelve (filas, cursor_siguiente) para `records` ordenado por `sort_by`.
+    `cursor_siguiente` es None en la última página.
+    """
+    field, descending = parse_sort(sort_by)
+    records = records.select_related('agent').annotate(sort_key=_sort_expression(field))
+    if descending:
+        records = records.order_by(F('sort_key').desc(), F('id').desc())
+    else:
+        records = records.order_by(F('sort_key').asc(), F('id').asc())
+
+    position = decode_cursor(cursor, field) if cursor else None
+    if position is not None:
+        value, pk = position
+        if descending:
+            records = records.filter(Q(sort_key__lt=value) | Q(sort_key=value, id__lt=pk))
+        else:
+            records = records.filter(Q(sort_key__gt=value) | Q(sort_key=value, id__gt=pk))
+
+    rows = list(records[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(last.sort_key, last.id)
@@ -0,0 +1,507 @@
+"""
+Generación de reportes y exports de registros.
+
+Los reportes usan hojas "write-only" de openpyxl: las filas se vuelcan a disco
+a medida que se generan en una sola pasada por la base y los estilos son
+estilos con nombre compartidos. Como esas hojas necesitan el ancho de las
+columnas antes de la primera fila, el de agente y notas es fijo y el texto más
+largo se ajusta en la celda. El xlsx es un ZIP que openpyxl arma al cerrar el
+libro: se guarda en un temporal y recién entonces se envía en bloques.
+
+El paquete de reportes por agente (ZIP) genera los Excel en paralelo en un
+pool de procesos compartido por todo el proceso web, a partir de una única
+consulta partida por agente que se va enviando al pool a medida que se lee.
+
+Para procesos automáticos hay además un export CSV / JSON lines que se genera
+fila por fila con un cursor del lado del servidor, sin pasar por openpyxl.
+
+En modo ASGI (vistas async) openpyxl, que es solo sincrónico, corre en un pool
+de threads acotado (settings.EXPORT_THREADS) y el archivo y las filas se envían
+con iteradores async, de modo que los exports no bloquean el event loop. Bajo
+WSGI el Excel se arma en el thread del request, como en una vista sincrónica,
+y la concurrencia la fijan los threads de gunicorn.
+"""
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from itertools import chain, groupby, islice
+from operator import itemgetter
+
+import django
+import openpyxl
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from .models import Record
+
+HEADERS = ['Agente', 'Tipo de Licencia', 'Fecha Inicio', 'Fecha Fin', 'Notas']
+RECORD_FIELDS = ('agent__name', 'record_type', 'fecha_inicio', 'fecha_fin', 'notes')
+RECORD_TYPE_LABELS = dict(Record.RECORD_TYPES)
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+DATE_WIDTH = len('dd/mm/aaaa')
+# Ancho fijo (en caracteres) de agente y notas en los reportes en streaming
+NAME_WIDTH = 30
+NOTES_WIDTH = 45
+CHUNK_SIZE = 2000
+# Excel del paquete por agente pendientes en el pool, por proceso
+BUNDLE_WINDOW = 2
+FILE_BLOCK_SIZE = 64 * 1024
+EXPORT_FIELDS = (
+    'id', 'agent_id', 'agent__name', 'agent__location',
+    'record_type', 'fecha_inicio', 'fecha_fin', 'notes',
+)
+EXPORT_HEADERS = (
+    'id', 'agent_id', 'agent_name', 'agent_location',
+    'record_type', 'fecha_inicio', 'fecha_fin', 'notes',
+)
+
+
+def _named_styles():
+    thin_side = Side(style='thin', color="000000")
+    thin_border = Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
+    center_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+    header = NamedStyle(name='sia_header')
+    header.font = Font(bold=True, color="FFFFFF")
+    header.fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
+    header.alignment = center_align
+    header.border = thin_border
+
+    cell = NamedStyle(name='sia_cell')
+    cell.alignment = center_align
+    cell.border = thin_border
+    return header, cell
+
+
+def report_queryset(records):
+    """Une con Agent y trae solo las columnas del reporte, en el orden del Excel."""
+    return records.values_list(*RECORD_FIELDS)
+
+
+def rows_column_widths(rows):
+    """Ancho de cada columna ajustado al contenido de filas ya leídas (en el orden de RECORD_FIELDS)."""
+    return _column_widths(
+        max((len(row[0]) for row in rows), default=0),
+        max((len(row[4] or '') for row in rows), default=0),
+    )
+
+
+def _column_widths(name_length, notes_length):
+    type_width = max(len(label) for label in RECORD_TYPE_LABELS.values())
+    content = [
+        name_length or 0,
+        type_width,
+        DATE_WIDTH,
+        DATE_WIDTH,
+        max(notes_length or 0, 1),  # "-" para notas vacías
+    ]
+    return [max(length, len(header)) + 5 for length, header in zip(content, HEADERS)]
+
+
+FIXED_WIDTHS = _column_widths(NAME_WIDTH, NOTES_WIDTH)
+
+
+def write_records_workbook(rows, title, widths, output):
+    """
+    Escribe el reporte en `output` (ruta o archivo binario).
+
+    `rows` es un iterable de tuplas en el orden de RECORD_FIELDS; se consume
+    una sola vez, de modo que puede ser un `.iterator()` de la base de datos.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    header_style, cell_style = _named_styles()
+    wb.add_named_style(header_style)
+    wb.add_named_style(cell_style)
+
+    ws = wb.create_sheet(title)
+    for i, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+    def styled(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    ws.append([styled(header, 'sia_header') for header in HEADERS])
+    for agent_name, record_type, fecha_inicio, fecha_fin, notes in rows:
+        ws.append([
+            styled(agent_name, 'sia_cell'),
+            styled(RECORD_TYPE_LABELS.get(record_type, record_type), 'sia_cell'),
+            styled(fecha_inicio.strftime('%d/%m/%Y'), 'sia_cell'),
+            styled(fecha_fin.strftime('%d/%m/%Y'), 'sia_cell'),
+            styled(notes or "-", 'sia_cell'),
+        ])
+    wb.save(output)
+
+
+def write_report_file(records, title):
+    """
+    Genera el reporte de `records` en un temporal posicionado al inicio, con
+    una sola consulta (ancho de columnas fijo, ver FIXED_WIDTHS).
+    """
+    output = tempfile.TemporaryFile()
+    write_records_workbook(
+        report_queryset(records).iterator(chunk_size=CHUNK_SIZE),
+        title,
+        FIXED_WIDTHS,
+        output,
+    )
+    output.seek(0)
+    return output
+
+
+def _report_file_response(output, filename, content_type=XLSX_CONTENT_TYPE):
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
+        content_type=content_type,
+    )
+
+
+def records_report_response(records, title, filename="Reporte SIA.xlsx"):
+    """Genera el reporte de `records` en un temporal y lo envía en bloques."""
+    return _report_file_response(write_report_file(records, title), filename)
+
+
+def agent_bundle_records(location=None, date_from=None, date_to=None):
+    """Registros de los agentes activos para el paquete de reportes, con filtros opcionales."""
+    records = Record.objects.filter(agent__active=True)
+    if location:
+        records = records.filter(agent__location=location)
+    # Registros que se superponen con [date_from, date_to]
+    if date_from:
+        records = records.filter(fecha_fin__gte=date_from)
+    if date_to:
+        records = records.filter(fecha_inicio__lte=date_to)
+    return records
+
+
+def _agent_partitions(records):
+    """
+    Una sola consulta ordenada por agente, partida en (agent_id, filas) con
+    groupby; las filas siguen el orden de RECORD_FIELDS.
+    """
+    rows = (
+        records.order_by('agent__name', 'agent_id', 'fecha_inicio', 'id')
+        .values_list('agent_id', *RECORD_FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for agent_id, group in groupby(rows, key=itemgetter(0)):
+        yield agent_id, [row[1:] for row in group]
+
+
+def _agent_workbook(title, rows):
+    """Excel de un agente en memoria (se ejecuta en los procesos del pool)."""
+    output = io.BytesIO()
+    write_records_workbook(rows, title, rows_column_widths(rows), output)
+    return output.getvalue()
+
+
+def _report_processes():
+    if settings.REPORT_PROCESSES:
+        return settings.REPORT_PROCESSES
+    # CPUs disponibles para este proceso (respeta los límites del contenedor)
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+
+_report_pool = None
+_report_pool_lock = threading.Lock()
+
+
+def _report_executor():
+    """
+    Pool de procesos de los reportes, uno por proceso web y reutilizado entre
+    requests: los paquetes simultáneos comparten sus procesos en lugar de
+    crear cada uno los suyos. Se crea al primer uso (después del fork de los
+    workers) con "spawn", porque el proceso web puede tener threads, y cada
+    proceso inicializa Django para poder importar este módulo.
+    """
+    global _report_pool
+    with _report_pool_lock:
+        if _report_pool is None:
+            _report_pool = ProcessPoolExecutor(
+                max_workers=_report_processes(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _report_pool
+
+
+def _discard_report_executor(pool):
+    """Descarta el pool si quedó roto (un proceso murió); el próximo uso crea otro."""
+    global _report_pool
+    with _report_pool_lock:
+        if _report_pool is pool:
+            _report_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _bundle_filename(agent_id, agent_name):
+    safe_name = ''.join('_' if char in '\\/:*?"<>|' else char for char in agent_name)
+    return f"{safe_name} ({agent_id}).xlsx"
+
+
+def _bundle_workbooks(partitions, processes):
+    """
+    (nombre, contenido) de cada Excel del paquete, en el orden de `partitions`.
+
+    Con más de un proceso y más de un agente los Excel se generan en el pool
+    compartido: cada partición se envía a medida que sale de la consulta y
+    hay a lo sumo BUNDLE_WINDOW × procesos pendientes, de modo que en memoria
+    solo están los agentes en curso y no la tabla completa.
+    """
+    first = next(partitions, None)
+    second = next(partitions, None)
+    partitions = chain(filter(None, (first, second)), partitions)
+    if processes <= 1 or second is None:
+        for name, title, rows in partitions:
+            yield name, _agent_workbook(title, rows)
+        return
+
+    pool = _report_executor()
+    pending = deque()
+    try:
+        for name, title, rows in partitions:
+            pending.append((name, pool.submit(_agent_workbook, title, rows)))
+            if len(pending) >= BUNDLE_WINDOW * processes:
+                name, future = pending.popleft()
+                yield name, future.result()
+        while pending:
+            name, future = pending.popleft()
+            yield name, future.result()
+    except BrokenProcessPool:
+        _discard_report_executor(pool)
+        raise
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def write_agent_bundle(records, output):
+    """
+    Escribe en `output` (ruta o archivo binario) un ZIP con el reporte Excel
+    de cada agente de `records`.
+
+    Las filas salen de una única consulta ordenada por agente; los Excel se
+    generan en paralelo en el pool de procesos compartido (settings.
+    REPORT_PROCESSES, por defecto uno por CPU) y se agregan al ZIP en orden.
+    Con un solo agente o un solo proceso no se usa el pool. Retorna la
+    cantidad de reportes.
+    """
+    partitions = (
+        (_bundle_filename(agent_id, rows[0][0]), f"Reporte {rows[0][0][:20]}", rows)
+        for agent_id, rows in _agent_partitions(records)
+    )
+    count = 0
+    # Los xlsx ya están comprimidos: el ZIP solo los agrupa
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as bundle:
+        for name, content in _bundle_workbooks(partitions, _report_processes()):
+            bundle.writestr(name, content)
+            count += 1
+    return count
+
+
+def write_bundle_file(records):
+    """Genera el paquete de reportes en un temporal posicionado al inicio."""
+    output = tempfile.TemporaryFile()
+    write_agent_bundle(records, output)
+    output.seek(0)
+    return output
+
+
+BALANCE_HEADERS = ['Agente', 'Ubicación', *RECORD_TYPE_LABELS.values(), 'Total']
+
+
+def write_balance_workbook(balances, title, output):
+    """
+    Escribe los saldos de licencias (ver balances.year_balances) en `output`:
+    una fila por agente con los días hábiles usados de cada tipo y el total.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    header_style, cell_style = _named_styles()
+    wb.add_named_style(header_style)
+    wb.add_named_style(cell_style)
+
+    ws = wb.create_sheet(title)
+    name_width = max([len(row['name']) for row in balances] + [len(BALANCE_HEADERS[0])])
+    location_width = max([len(row['location'] or '-') for row in balances] + [len(BALANCE_HEADERS[1])])
+    widths = [name_width, location_width] + [len(header) for header in BALANCE_HEADERS[2:]]
+    for i, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(i)].width = width + 5
+
+    def styled(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    ws.append([styled(header, 'sia_header') for header in BALANCE_HEADERS])
+    for row in balances:
+        ws.append([
+            styled(row['name'], 'sia_cell'),
+            styled(row['location'] or '-', 'sia_cell'),
+            *(styled(days, 'sia_cell') for days in row['days'].values()),
+            styled(row['total'], 'sia_cell'),
+        ])
+    wb.save(output)
+
+
+def balance_report_response(balances, year):
+    """Excel con los saldos de licencias del año."""
+    output = tempfile.TemporaryFile()
+    write_balance_workbook(balances, f"Licencias {year}", output)
+    output.seek(0)
+    return _report_file_response(output, f"Licencias {year}.xlsx")
+
+
+_export_pool = None
+
+
+def _export_executor():
+    global _export_pool
+    if _export_pool is None:
+        _export_pool = ThreadPoolExecutor(
+            max_workers=settings.EXPORT_THREADS, thread_name_prefix='sia-export'
+        )
+    return _export_pool
+
+
+def _run_and_close(func, args):
+    try:
+        return func(*args)
+    finally:
+        # Cada thread del pool tiene su propia conexión: no dejarla abierta
+        connections.close_all()
+
+
+async def run_in_export_pool(func, *args):
+    """Ejecuta `func(*args)` (código sincrónico) en el pool de exports."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_export_executor(), partial(_run_and_close, func, args))
+
+
+async def _file_blocks(output):
+    # Lectura de un temporal local: bloques chicos, no vale la pena otro thread
+    while block := output.read(FILE_BLOCK_SIZE):
+        yield block
+
+
+async def _write_export(func, args, asgi):
+    if asgi:
+        return await run_in_export_pool(func, *args)
+    # WSGI: thread del request (el worker de gunicorn), sin pasar por el pool
+    return await sync_to_async(func)(*args)
+
+
+async def arecords_report_response(records, title, filename="Reporte SIA.xlsx", stream_async=True):
+    """
+    Versión async de `records_report_response`. Con `stream_async` (servidor
+    ASGI) el Excel se arma en el pool de exports y se envía con un iterador
+    async; bajo WSGI se arma en el thread del request y se deja el iterador
+    sincrónico del FileResponse.
+    """
+    output = await _write_export(write_report_file, (records, title), stream_async)
+    response = _report_file_response(output, filename)
+    if stream_async:
+        response.streaming_content = _file_blocks(output)
+    return response
+
+
+async def abundle_response(records, filename, stream_async=True):
+    """ZIP con un Excel por agente (ver write_agent_bundle); igual que `arecords_report_response`."""
+    output = await _write_export(write_bundle_file, (records,), stream_async)
+    response = _report_file_response(output, filename, content_type='application/zip')
+    if stream_async:
+        response.streaming_content = _file_blocks(output)
+    return response
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def _line_format(export_format):
+    """(encabezado o None, función fila -> línea) del formato pedido."""
+    if export_format == 'jsonl':
+        return None, _jsonl_line
+    writer = csv.writer(_Echo())
+    return writer.writerow(EXPORT_HEADERS), writer.writerow
+
+
+def _jsonl_line(row):
+    item = dict(zip(EXPORT_HEADERS, row))
+    item['fecha_inicio'] = item['fecha_inicio'].isoformat()
+    item['fecha_fin'] = item['fecha_fin'].isoformat()
+    return json.dumps(item, ensure_ascii=False) + "\n"
+
+
+def _lines(rows, export_format):
+    header, line = _line_format(export_format)
+    if header is not None:
+        yield header
+    for row in rows:
+        yield line(row)
+
+
+async def _arows(rows):
+    """
+    Recorre un `.iterator()` por bloques desde código async. (Los
+    `values_list().aiterator()` de Django 5.1 ejecutan la consulta en el
+    event loop; así el cursor queda siempre en el mismo thread.)
+    """
+    next_chunk = sync_to_async(lambda: list(islice(rows, CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
+
+
+async def _alines(rows, export_format):
+    header, line = _line_format(export_format)
+    if header is not None:
+        yield header
+    async for row in rows:
+        yield line(row)
+
+
+def records_stream_response(records, export_format='csv', stream_async=False):
+    """
+    Envía `records` (unidos con el nombre y la ubicación del agente) como CSV
+    o JSON lines. Las filas se leen con `.iterator()` (cursor del lado del
+    servidor en PostgreSQL) y se escriben a medida que llegan. Con
+    `stream_async` (servidor ASGI) las filas se leen por bloques con un
+    iterador async para no acumular el export en memoria.
+    """
+    rows = records.values_list(*EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+    if stream_async:
+        content = _alines(_arows(rows), export_format)
+    else:
+        content = _lines(rows, export_format)
+
+    if export_format == 'jsonl':
+        response = StreamingHttpResponse(
+            content, content_type='application/x-ndjson; charset=utf-8'
+        )
+        filename = 'registros.jsonl'
+    else:
+        response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+        filename = 'registros.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,126 @@
+"""
+Búsqueda insensible a acentos sobre nombre y ubicación del agente y notas
+del registro (parámetro `search` del panel).
+
+- PostgreSQL: índices GIN trigram (pg_trgm) sobre `experimentapp_unaccent(...)`,
+  un envoltorio IMMUTABLE de `unaccent(lower(...))` creado en la migración 0006.
+- SQLite: tablas FTS5 con tokenizer trigram (`experimentapp_agent_search` y
+  `experimentapp_record_search`, rowid = id) que guardan el texto ya
+  normalizado y se mantienen sincronizadas con señales (ver signals.py).
+- Otros motores: `icontains` como antes.
+
+En ambos casos el patrón `%texto%` / `*texto*` se resuelve con el índice
+trigram en lugar de recorrer la tabla completa.
+"""
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+AGENT_TABLE = 'experimentapp_agent_search'
+RECORD_TABLE = 'experimentapp_record_search'
+# Entre nombre y ubicación en el documento del agente. Se quita de las
+# búsquedas, así que ningún patrón coincide cruzando de un campo al otro
+# (PostgreSQL compara cada columna por separado)
+DOCUMENT_SEPARATOR = '\n'
+
+
+def normalize(text):
+    """Minúsculas y sin acentos: "María" -> "maria"."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _like_pattern(query):
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _glob_pattern(query):
+    query = normalize(query).replace(DOCUMENT_SEPARATOR, ' ')
+    escaped = ''.join(f'[{c}]' if c in '*?[' else c for c in query)
+    return f'*{escaped}*'
+
+
+def agent_document(agent):
+    return normalize(agent.name) + DOCUMENT_SEPARATOR + normalize(agent.location)
+
+
+def record_document(record):
+    return normalize(record.notes)
+
+
+def search_filter(query):
+    """Q sobre Record que coincide con `query` en agente, ubicación o notas."""
+    if connection.vendor == 'postgresql':
+        pattern = _like_pattern(query)
+        matching_agents = RawSQL(
+            "SELECT id FROM experimentapp_agent"
+            " WHERE experimentapp_unaccent(name) LIKE experimentapp_unaccent(%s)"
+            " OR experimentapp_unaccent(location) LIKE experimentapp_unaccent(%s)",
+            [pattern, pattern],
+        )
+        matching_records = RawSQL(
+            "SELECT id FROM experimentapp_record"
+            " WHERE experimentapp_unaccent(notes) LIKE experimentapp_unaccent(%s)",
+            [pattern],
+        )
+    elif connection.vendor == 'sqlite':
+        pattern = _glob_pattern(query)
+        matching_agents = RawSQL(f"SELECT rowid FROM {AGENT_TABLE} WHERE content GLOB %s", [pattern])
+        matching_records = RawSQL(f"SELECT rowid FROM {RECORD_TABLE} WHERE content GLOB %s", [pattern])
+    else:
+        return (
+            Q(agent__name__icontains=query) |
+            Q(agent__location__icontains=query) |
+            Q(notes__icontains=query)
+        )
+    return Q(agent_id__in=matching_agents) | Q(id__in=matching_records)
+
+
+def _replace_rows(table, rows):
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(pk,) for pk, _ in rows])
+        cursor.executemany(
+            f"INSERT INTO {table} (rowid, content) VALUES (%s, %s)",
+            [(pk, content) for pk, content in rows if content],
+        )
+
+
+def index_agents(agents):
+    """Actualiza el índice SQLite para los agentes dados (no-op en otros motores)."""
+    if connection.vendor == 'sqlite':
+        _replace_rows(AGENT_TABLE, [(agent.pk, agent_document(agent)) for agent in agents])
+
+
+def index_records(records):
+    """Actualiza el índice SQLite para los registros dados (no-op en otros motores)."""
+    if connection.vendor == 'sqlite':
+        _replace_rows(RECORD_TABLE, [(record.pk, record_document(record)) for record in records])
+
+
+def unindex(table, pks):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(pk,) for pk in pks])
+
+
+def rebuild():
+    """Regenera por completo el índice SQLite (por ejemplo tras cargas masivas)."""
+    if connection.vendor != 'sqlite':
+        return
+    from .models import Agent, Record
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {AGENT_TABLE}")
+        cursor.execute(f"DELETE FROM {RECORD_TABLE}")
+    index_agents(Agent.objects.only('name', 'location').iterator(chunk_size=2000))
+
+    batch = []
+    for record in Record.objects.exclude(notes__isnull=True).exclude(notes='').only('notes').iterator(chunk_size=2000):
+        batch.append(record)
+        if len(batch) >= 2000:
+            index_records(batch)
+            batch = []
+    index_records(batch)
@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import availability, cache, search
+from .models import Agent, Record
+
+
+# Índice de búsqueda (solo SQLite; en PostgreSQL se usan índices de expresión)
+@receiver(post_save, sender=Agent)
+def index_agent(sender, instance, **kwargs):
+    search.index_agents([instance])
+
+
+@receiver(post_delete, sender=Agent)
+def unindex_agent(sender, instance, **kwargs):
+    search.unindex(search.AGENT_TABLE, [instance.pk])
+
+
+@receiver(post_save, sender=Record)
+def index_record(sender, instance, **kwargs):
+    search.index_records([instance])
+
+
+@receiver(post_delete, sender=Record)
+def unindex_record(sender, instance, **kwargs):
+    search.unindex(search.RECORD_TABLE, [instance.pk])
+
+
+# Estado precalculado de disponibilidad (AgentStatus)
+def _refresh_status_on_commit(*agent_ids):
+    agent_ids = {agent_id for agent_id in agent_ids if agent_id is not None}
+    # Tras el commit: si el agente se está borrando en cascada ya no existe
+    transaction.on_commit(lambda: availability.refresh_snapshots(agent_ids))
+
+
+@receiver(pre_save, sender=Record)
+def remember_previous_agent(sender, instance, **kwargs):
+    # Al editar un registro puede cambiar de agente: hay que recalcular ambos
+    instance._previous_agent_id = None
+    if instance.pk:
+        instance._previous_agent_id = (
+            Record.objects.filter(pk=instance.pk).values_list('agent_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Record)
+def refresh_status_on_save(sender, instance, **kwargs):
+    _refresh_status_on_commit(instance.agent_id, getattr(instance, '_previous_agent_id', None))
+
+
+@receiver(post_delete, sender=Record)
+def refresh_status_on_delete(sender, instance, **kwargs):
+    _refresh_status_on_commit(instance.agent_id)
+
+
+# Versión de datos para la caché de vistas (después de los recálculos anteriores)
+@receiver(post_save, sender=Agent)
+@receiver(post_delete, sender=Agent)
+@receiver(post_save, sender=Record)
+@receiver(post_delete, sender=Record)
+@receiver(post_delete, sender=User)
+def bump_data_version(sender, **kwargs):
+    cache.bump_data_version()
+
+
+@receiver(post_save, sender=Agent)
+@receiver(post_delete, sender=Agent)
+def bump_agents_version(sender, **kwargs):
+    cache.bump_agents_version()
+
+
+@receiver(post_delete, sender=Record)
+def bump_record_deletions(sender, **kwargs):
+    cache.bump_record_deletions()
+
+
+@receiver(post_save, sender=User)
+def bump_data_version_on_user_change(sender, update_fields=None, **kwargs):
+    # El login solo actualiza last_login: no cambia nada de lo que se muestra
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    cache.bump_data_version()
@@ -0,0 +1,29 @@
+/*
+ * Traducción al español de flatpickr (equivalente a dist/l10n/es.js del
+ * paquete, que no se incluye entre las librerías fijadas en assets.py).
+ * Debe cargarse después de flatpickr.
+ */
+(function (flatpickr) {
+    if (typeof flatpickr === 'undefined') {
+        return;
+    }
+    flatpickr.l10ns.es = {
+        weekdays: {
+            shorthand: ['Dom', 'Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb'],
+            longhand: ['Domingo', 'Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado'],
+        },
+        months: {
+            shorthand: ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic'],
+            longhand: [
+                'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+                'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre',
+            ],
+        },
+        ordinal: function () {
+            return 'º';
+        },
+        firstDayOfWeek: 1,
+        rangeSeparator: ' a ',
+        time_24hr: true,
+    };
+})(window.flatpickr);
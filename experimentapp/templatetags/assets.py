@@ -0,0 +1,11 @@
+from django import template
+
+from experimentapp.assets import asset_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor(name):
+    """{% vendor 'flatpickr.js' %}: URL de una librería de front-end (ver assets.py)."""
+    return asset_url(name)
@@ -1,3 +1,1056 @@
-from django.test import TestCase
+import base64
+import importlib
+import io
+import json
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
 
-# Create your tests here.
+import openpyxl
+
+from django.contrib.auth.models import User
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from experimento.querycheck import QueryBudgetMixin
+
+from . import absences, availability, balances, business_days, headcount, search
+from .cache import bump_data_version, cached_for_data_version
+from .pagination import encode_cursor, keyset_page
+from .models import Agent, AgentStatus, Record
+from .overlaps import find_overlap_clusters, overlapping_record_ids
+from .importer import import_records
+from .reports import agent_bundle_records, write_agent_bundle
+
+# Sin caché de respuestas: cache_per_role ocultaría las consultas de la vista
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+AGENTS = 8
+RECORDS_PER_AGENT = 3
+
+
+@override_settings(CACHES=NO_CACHE, NPLUSONE_MODE='off')
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Máximo de consultas de las vistas más usadas. Hay más agentes y registros
+    que el umbral de N+1, así que una consulta por fila hace fallar el test.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'clave-de-prueba')
+        cls.agents = [
+            Agent.objects.create(name=f'Agente {i}', location='CENTRAL' if i % 2 else 'TRAMO I')
+            for i in range(AGENTS)
+        ]
+        # Las señales recalculan AgentStatus en on_commit
+        with cls.captureOnCommitCallbacks(execute=True):
+            for agent in cls.agents:
+                for j in range(RECORDS_PER_AGENT):
+                    start = today + timedelta(days=10 * j - 1)
+                    Record.objects.create(
+                        agent=agent, record_type='vacaciones',
+                        fecha_inicio=start, fecha_fin=start + timedelta(days=3),
+                    )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, url, max_queries, **params):
+        with self.assertQueryBudget(max_queries):
+            response = self.client.get(url, params)
+            if response.streaming:
+                # Las consultas de un export en streaming corren al consumirlo
+                response.streamed = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_home_agentes(self):
+        response = self.get('/', 5, view='agentes')
+        self.assertContains(response, f'Agente {AGENTS - 1}')
+
+    def test_home_de_licencia(self):
+        response = self.get('/', 4, view='de_licencia')
+        self.assertContains(response, f'Agente {AGENTS - 1}')
+
+    def test_home_asistencia(self):
+        response = self.get('/', 4, view='asistencia', type='vacaciones')
+        self.assertContains(response, f'Agente {AGENTS - 1}')
+
+    def test_calendar_data(self):
+        today = date.today()
+        response = self.get(
+            f'/agent/{self.agents[0].id}/calendar-data/', 5,
+            start=today.replace(day=1).isoformat(),
+            end=(today.replace(day=1) + timedelta(days=42)).isoformat(),
+        )
+        self.assertTrue(response.json())
+
+    def test_export_records_csv(self):
+        response = self.get('/export-records/', 3)
+        self.assertIn(f'Agente {AGENTS - 1}', response.streamed.decode())
+
+    # Bajo WSGI (el cliente de tests) el Excel se arma en el thread del request
+    def test_export_full_report(self):
+        response = self.get('/export-full-report/', 3)
+        self.assertTrue(response.streamed.startswith(b'PK'))
+
+    def test_export_agent_report(self):
+        response = self.get(f'/export-report/{self.agents[0].id}/', 5)
+        sheet = openpyxl.load_workbook(io.BytesIO(response.streamed)).active
+        self.assertEqual(sheet.max_row, RECORDS_PER_AGENT + 1)
+
+
+@override_settings(CACHES=NO_CACHE)
+class CalendarRangeTests(TestCase):
+    """Ventana `start`/`end` de calendar-data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'clave-de-prueba')
+        cls.agent = Agent.objects.create(name='Agente', location='CENTRAL')
+        # Jueves 2 a martes 7 de octubre de 2025 (sin feriados)
+        Record.objects.create(
+            agent=cls.agent, record_type='vacaciones',
+            fecha_inicio=date(2025, 10, 2), fecha_fin=date(2025, 10, 7),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = f'/agent/{self.agent.id}/calendar-data/'
+
+    def events(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [event for event in response.json() if event.get('display') != 'background']
+
+    def test_events_are_weekday_runs_clipped_to_the_window(self):
+        events = self.events(start='2025-10-03T00:00:00-03:00', end='2025-11-01')
+        self.assertEqual(
+            [(event['start'], event['end']) for event in events],
+            [('2025-10-03', '2025-10-04'), ('2025-10-06', '2025-10-08')],
+        )
+
+    def test_without_params_uses_the_current_month(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_ranges_are_rejected(self):
+        for params in (
+            {'start': '2025-10-01'},
+            {'start': 'ayer', 'end': '2025-11-01'},
+            {'start': '2025-11-01', 'end': '2025-10-01'},
+            {'start': '2025-10-01', 'end': '2025-10-01'},
+            {'start': '2026-01-01', 'end': '2026-12-31'},
+            {'start': '9999-12-01', 'end': '9999-12-31'},
+        ):
+            with self.subTest(**params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+@override_settings(CACHES=NO_CACHE)
+class HeadcountTests(TestCase):
+    """Ausentes por ubicación y día (headcount.location_headcount y su API)."""
+
+    # Lunes 24 (feriado) a domingo 30 de noviembre de 2025
+    START, END = date(2025, 11, 24), date(2025, 11, 30)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'clave-de-prueba')
+        first = Agent.objects.create(name='Primero', location='CENTRAL')
+        second = Agent.objects.create(name='Segundo', location='CENTRAL')
+        inactive = Agent.objects.create(name='Inactivo', location='TRAMO I', active=False)
+        Agent.objects.create(name='Sin licencias', location='TRAMO I')
+        for agent, record_type, start, end in (
+            (first, 'vacaciones', date(2025, 11, 20), date(2025, 11, 26)),
+            # Superpuesto con las vacaciones: el agente cuenta una sola vez
+            (first, 'comision', date(2025, 11, 25), date(2025, 11, 25)),
+            (second, 'franquicia', date(2025, 11, 27), date(2025, 11, 28)),
+            (inactive, 'vacaciones', date(2025, 11, 24), date(2025, 11, 28)),
+        ):
+            Record.objects.create(agent=agent, record_type=record_type, fecha_inicio=start, fecha_fin=end)
+
+    def test_absent_per_location_and_day(self):
+        result = headcount.location_headcount(self.START, self.END)
+        self.assertEqual(result.locations, ['CENTRAL', 'TRAMO I'])
+        self.assertEqual(result.staff, [2, 1])
+        self.assertEqual(result.working.tolist(), [False, True, True, True, True, False, False])
+        self.assertEqual(result.absent.tolist(), [[0, 1, 1, 1, 1, 0, 0], [0] * 7])
+
+        by_type = dict(zip(result.record_types, result.by_type[:, 0].tolist()))
+        self.assertEqual(by_type['vacaciones'], [0, 1, 1, 0, 0, 0, 0])
+        self.assertEqual(by_type['comision'], [0, 1, 0, 0, 0, 0, 0])
+        self.assertEqual(by_type['franquicia'], [0, 0, 0, 1, 1, 0, 0])
+
+    def test_location_and_type_filters(self):
+        result = headcount.location_headcount(self.START, self.END, location='CENTRAL', record_type='franquicia')
+        self.assertEqual(result.locations, ['CENTRAL'])
+        self.assertEqual(result.absent.tolist(), [[0, 0, 0, 1, 1, 0, 0]])
+
+    def test_api_rejects_invalid_ranges(self):
+        self.client.force_login(self.user)
+        for params in (
+            {'from': '2025-11-30', 'to': '2025-11-24'},
+            {'from': '2024-01-01', 'to': '2025-12-31'},
+            {'from': '15/12/9999'},
+            {'from': '9999-12-15'},
+        ):
+            with self.subTest(**params):
+                response = self.client.get('/api/headcount/', params)
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=NO_CACHE)
+class AgentBundleTests(TestCase):
+    """Paquete ZIP con un Excel por agente activo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agents = []
+        for i, location in enumerate(('CENTRAL', 'CENTRAL', 'TRAMO I', 'TRAMO I')):
+            agent = Agent.objects.create(name=f'Agente {i}', location=location)
+            cls.agents.append(agent)
+            for j in range(i + 1):
+                start = date(2025, 3, 3) + timedelta(days=7 * j)
+                Record.objects.create(
+                    agent=agent, record_type='franquicia', fecha_inicio=start, fecha_fin=start,
+                    notes='Nota' if j == 0 else '',
+                )
+        inactive = Agent.objects.create(name='Agente inactivo', location='CENTRAL', active=False)
+        Record.objects.create(
+            agent=inactive, record_type='vacaciones',
+            fecha_inicio=date(2025, 3, 3), fecha_fin=date(2025, 3, 7),
+        )
+
+    def bundle(self, records):
+        output = io.BytesIO()
+        count = write_agent_bundle(records, output)
+        bundle = zipfile.ZipFile(output)
+        self.assertEqual(count, len(bundle.namelist()))
+        return bundle
+
+    def sheet_rows(self, bundle, name):
+        workbook = openpyxl.load_workbook(io.BytesIO(bundle.read(name)))
+        return [tuple(row) for row in workbook.active.iter_rows(values_only=True)]
+
+    def assert_bundle(self, bundle):
+        self.assertEqual(bundle.namelist(), [f'Agente {i} ({agent.id}).xlsx' for i, agent in enumerate(self.agents)])
+        rows = self.sheet_rows(bundle, f'Agente 2 ({self.agents[2].id}).xlsx')
+        self.assertEqual(rows[0], ('Agente', 'Tipo de Licencia', 'Fecha Inicio', 'Fecha Fin', 'Notas'))
+        self.assertEqual(rows[1:], [
+            ('Agente 2', 'Franquicia', '03/03/2025', '03/03/2025', 'Nota'),
+            ('Agente 2', 'Franquicia', '10/03/2025', '10/03/2025', '-'),
+            ('Agente 2', 'Franquicia', '17/03/2025', '17/03/2025', '-'),
+        ])
+
+    @override_settings(REPORT_PROCESSES=1)
+    def test_one_workbook_per_active_agent(self):
+        self.assert_bundle(self.bundle(agent_bundle_records()))
+
+    @override_settings(REPORT_PROCESSES=2)
+    def test_process_pool_keeps_the_order(self):
+        self.assert_bundle(self.bundle(agent_bundle_records()))
+
+    @override_settings(REPORT_PROCESSES=1)
+    def test_location_and_date_filters(self):
+        bundle = self.bundle(agent_bundle_records('TRAMO I', date(2025, 3, 10), date(2025, 3, 16)))
+        self.assertEqual(bundle.namelist(), [
+            f'Agente {i} ({self.agents[i].id}).xlsx' for i in (2, 3)
+        ])
+        self.assertEqual(len(self.sheet_rows(bundle, f'Agente 3 ({self.agents[3].id}).xlsx')), 2)
+
+
+@override_settings(CACHES=NO_CACHE)
+class ImporterTests(TestCase):
+    """Importación de registros desde CSV."""
+
+    HEADER = 'Agente;Tipo de Licencia;Fecha Inicio;Fecha Fin;Notas\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = Agent.objects.create(name='María Pérez', location='CENTRAL')
+
+    def run_import(self, body, **options):
+        data = (self.HEADER + body).encode() if isinstance(body, str) else self.HEADER.encode() + body
+        return import_records(io.BytesIO(data), 'registros.csv', **options)
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        result = self.run_import(
+            'maria perez;Vacaciones;01/12/2025;05/12/2025;Viaje\n'
+            'María Pérez;razon particular;2025-12-10;;-\n'
+            'Nadie;Vacaciones;01/12/2025;05/12/2025;\n'
+            'María Pérez;Feriado;01/12/2025;05/12/2025;\n'
+            'María Pérez;Franquicia;05/12/2025;01/12/2025;\n'
+            ';;;;\n'
+            'María Pérez;Comisión;31/02/2025;;\n'
+        )
+        self.assertEqual((result.rows, result.created), (6, 2))
+        self.assertEqual([row for row, _ in result.errors], [4, 5, 6, 8])
+        self.assertEqual(
+            list(Record.objects.order_by('fecha_inicio').values_list('record_type', 'fecha_inicio', 'fecha_fin', 'notes')),
+            [
+                ('vacaciones', date(2025, 12, 1), date(2025, 12, 5), 'Viaje'),
+                ('razon_particular', date(2025, 12, 10), date(2025, 12, 10), ''),
+            ],
+        )
+
+    def test_dry_run_saves_nothing(self):
+        result = self.run_import('María Pérez;Vacaciones;01/12/2025;05/12/2025;\n', dry_run=True)
+        self.assertEqual((result.rows, result.created, result.errors), (1, 1, []))
+        self.assertFalse(Record.objects.exists())
+
+    def test_batches_are_committed_together(self):
+        rows = ''.join(f'María Pérez;Franquicia;{day:02d}/12/2025;;\n' for day in range(1, 8))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            result = self.run_import(rows, batch_size=3)
+        self.assertEqual(result.created, 7)
+        self.assertEqual(Record.objects.count(), 7)
+        # Estados de los agentes y versión de datos: una vez por importación
+        self.assertEqual(len(callbacks), 2)
+
+    def test_unreadable_file_saves_no_batch(self):
+        rows = ''.join(f'María Pérez;Franquicia;01/12/2025;;Fila {n}\n' for n in range(400)).encode()
+        with self.assertRaises(ValueError):
+            # Un byte inválido después de varios lotes ya insertados
+            self.run_import(rows + b'Mar\xeda P\xe9rez;Franquicia;01/12/2025;;\n', batch_size=50)
+        self.assertFalse(Record.objects.exists())
+
+    def test_missing_columns(self):
+        result = import_records(io.BytesIO(b'Agente;Notas\nX;Y\n'), 'registros.csv')
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.errors[0][0], 1)
+
+
+@override_settings(CACHES=NO_CACHE)
+class BalancesTests(TestCase):
+    """Días hábiles de licencia usados por agente, año y tipo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = Agent.objects.create(name='Agente', location='CENTRAL')
+        cls.idle = Agent.objects.create(name='Sin licencias', location='CENTRAL')
+        cls.former = Agent.objects.create(name='Dado de baja', location='CENTRAL', active=False)
+        Agent.objects.create(name='Baja sin licencias', location='CENTRAL', active=False)
+        for agent, record_type, start, end in (
+            # Jueves 20 a miércoles 26 de noviembre de 2025; el lunes 24 es feriado
+            (cls.agent, 'vacaciones', date(2025, 11, 20), date(2025, 11, 26)),
+            (cls.agent, 'vacaciones', date(2025, 11, 21), date(2025, 11, 21)),
+            (cls.agent, 'comision', date(2025, 11, 25), date(2025, 11, 27)),
+            # Cruza el fin de año; el 1 de enero es feriado
+            (cls.agent, 'franquicia', date(2025, 12, 30), date(2026, 1, 2)),
+            (cls.former, 'razon_particular', date(2025, 3, 10), date(2025, 3, 10)),
+        ):
+            Record.objects.create(agent=agent, record_type=record_type, fecha_inicio=start, fecha_fin=end)
+
+    def test_days_per_type_and_total(self):
+        rows = {row['agent_id']: row for row in balances.year_balances(2025)}
+        self.assertEqual(set(rows), {self.agent.id, self.idle.id, self.former.id})
+        self.assertEqual(rows[self.agent.id]['days'], {
+            'vacaciones': 4, 'franquicia': 2, 'razon_particular': 0, 'comision': 3,
+        })
+        # Los días 25 y 26 tienen vacaciones y comisión: cuentan una vez en el total
+        self.assertEqual(rows[self.agent.id]['total'], 7)
+        self.assertEqual(rows[self.idle.id]['total'], 0)
+        self.assertEqual(rows[self.former.id]['days']['razon_particular'], 1)
+
+    def test_record_split_across_years(self):
+        rows = {row['agent_id']: row for row in balances.year_balances(2026)}
+        self.assertEqual(rows[self.agent.id]['days']['franquicia'], 1)
+        self.assertEqual(rows[self.agent.id]['total'], 1)
+        self.assertNotIn(self.former.id, rows)
+
+
+class IntervalIndexTests(TestCase):
+    """Árbol de intervalos de absences.py, contra una búsqueda lineal."""
+
+    def test_matches_linear_scan(self):
+        index = absences.IntervalIndex()
+        base = date(2025, 1, 1)
+        intervals = {
+            record_id: (base + timedelta(days=(record_id * 37) % 300), (record_id * 11) % 40)
+            for record_id in range(1, 200)
+        }
+        index.add_many(
+            (record_id, record_id % 7, 'vacaciones', start, start + timedelta(days=length))
+            for record_id, (start, length) in intervals.items()
+        )
+        for record_id in range(1, 200, 3):
+            index.remove(record_id)
+        for offset in range(0, 360, 13):
+            first = base + timedelta(days=offset)
+            last = first + timedelta(days=offset % 9)
+            expected = {
+                record_id
+                for record_id, (start, length) in intervals.items()
+                if record_id % 3 != 1 and start <= last and start + timedelta(days=length) >= first
+            }
+            self.assertEqual(set(index.overlapping(first, last)), expected)
+
+    def test_add_replaces_previous_interval(self):
+        index = absences.IntervalIndex()
+        index.add(1, 1, 'vacaciones', date(2025, 1, 1), date(2025, 1, 5))
+        index.add(1, 1, 'vacaciones', date(2025, 3, 1), date(2025, 3, 5))
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.overlapping(date(2025, 1, 1), date(2025, 1, 31)), [])
+        self.assertEqual(index.overlapping(date(2025, 3, 5), date(2025, 3, 5)), [1])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class AbsencesTests(TestCase):
+    """Índice de ausencias sincronizado con los cambios de registros y agentes."""
+
+    DAY = date(2025, 12, 3)
+
+    def setUp(self):
+        cache.clear()
+        absences._index = None
+        self.addCleanup(setattr, absences, '_index', None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agent = Agent.objects.create(name='Activo', location='CENTRAL')
+            self.other = Agent.objects.create(name='Otro', location='CENTRAL')
+            self.record = Record.objects.create(
+                agent=self.agent, record_type='vacaciones',
+                fecha_inicio=date(2025, 12, 1), fecha_fin=date(2025, 12, 5),
+            )
+
+    def absent_agents(self, day=DAY):
+        return [row['agent_id'] for row in absences.absent_between(day, day)]
+
+    def test_created_edited_and_deleted_records(self):
+        self.assertEqual(self.absent_agents(), [self.agent.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Record.objects.create(
+                agent=self.other, record_type='comision',
+                fecha_inicio=date(2025, 12, 3), fecha_fin=date(2025, 12, 3),
+            )
+            self.record.fecha_fin = date(2025, 12, 2)
+            self.record.save()
+        self.assertEqual(self.absent_agents(), [self.other.id])
+        self.assertEqual(self.absent_agents(date(2025, 12, 1)), [self.agent.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(self.absent_agents(), [])
+
+    def test_deactivated_and_reactivated_agent(self):
+        self.assertEqual(self.absent_agents(), [self.agent.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agent.active = False
+            self.agent.save()
+        self.assertEqual(self.absent_agents(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agent.active = True
+            self.agent.save()
+        self.assertEqual(self.absent_agents(), [self.agent.id])
+
+    def test_record_moved_to_inactive_agent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            former = Agent.objects.create(name='Dado de baja', location='CENTRAL', active=False)
+        self.assertEqual(self.absent_agents(), [self.agent.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record.agent = former
+            self.record.save()
+        self.assertEqual(self.absent_agents(), [])
+
+
+@override_settings(CACHES=NO_CACHE, PERFORMANCE_SAMPLE_RATE=1.0)
+class PerformanceLogTests(TestCase):
+    """Log de experimento.performance: solo los requests lentos."""
+
+    @override_settings(PERFORMANCE_SLOW_MS=60_000)
+    def test_fast_requests_are_not_logged(self):
+        with self.assertNoLogs('experimento.performance'):
+            response = self.client.get('/ping/')
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(PERFORMANCE_SLOW_MS=0)
+    def test_threshold_zero_logs_every_request(self):
+        with self.assertLogs('experimento.performance') as logs:
+            self.client.get('/ping/')
+        self.assertIn('"path": "/ping/"', logs.output[0])
+
+
+@override_settings(CACHES=NO_CACHE)
+class KeysetPaginationTests(TestCase):
+    """Paginación por cursor del listado de asistencia."""
+
+    SORT_KEYS = {
+        'agent__name': lambda record: record.agent.name,
+        # Las ubicaciones NULL se ordenan como cadena vacía
+        'agent__location': lambda record: record.agent.location or '',
+        'fecha_inicio': lambda record: record.fecha_inicio,
+        'fecha_fin': lambda record: record.fecha_fin,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        agents = [
+            Agent.objects.create(name=name, location=location)
+            for name, location in (('Ana', 'NORTE'), ('Beto', None), ('Ana', None), ('Carla', 'SUR'))
+        ]
+        # Muchos empates en cada columna: el id desempata
+        for n in range(23):
+            Record.objects.create(
+                agent=agents[n % 4], record_type='vacaciones',
+                fecha_inicio=date(2025, 10, 1 + n % 3), fecha_fin=date(2025, 10, 5 + n % 2),
+            )
+
+    def all_pages(self, sort_by, page_size=4):
+        ids, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(Record.objects.all(), sort_by, cursor, page_size)
+            ids.extend(row.id for row in rows)
+            if cursor is None:
+                return ids
+
+    def test_pages_follow_the_full_order_without_gaps(self):
+        for sort_by in ('agent__name', '-agent__name', 'agent__location', '-agent__location',
+                        'fecha_inicio', '-fecha_inicio', '-fecha_fin'):
+            with self.subTest(sort_by=sort_by):
+                key = self.SORT_KEYS[sort_by.lstrip('-')]
+                expected = sorted(
+                    Record.objects.select_related('agent'),
+                    key=lambda record: (key(record), record.id),
+                    reverse=sort_by.startswith('-'),
+                )
+                self.assertEqual(self.all_pages(sort_by), [record.id for record in expected])
+
+    def test_new_records_do_not_shift_later_pages(self):
+        first, cursor = keyset_page(Record.objects.all(), 'fecha_inicio', None, 5)
+        # Un registro que va antes del cursor no se repite ni corre la página siguiente
+        Record.objects.create(
+            agent=first[0].agent, record_type='comision',
+            fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 1),
+        )
+        second, _ = keyset_page(Record.objects.all(), 'fecha_inicio', cursor, 5)
+        expected = self.all_pages('fecha_inicio', page_size=100)[6:11]
+        self.assertEqual([row.id for row in second], expected)
+
+    def test_invalid_cursor_returns_the_first_page(self):
+        first, _ = keyset_page(Record.objects.all(), 'agent__name', None, 5)
+
+        def raw(value, pk):
+            return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+        for sort_by, cursor in (
+            ('agent__name', 'no es base64 ¡'),
+            ('agent__name', base64.urlsafe_b64encode(b'{"a": 1}').decode()),
+            ('agent__name', base64.urlsafe_b64encode(b'\xff\xfe').decode()),
+            ('agent__name', raw(['Ana'], 1)),
+            ('agent__name', raw(7, 1)),
+            ('agent__name', raw('Ana\x00', 1)),
+            ('agent__name', raw('Ana', '1')),
+            ('agent__name', raw('Ana', 1.5)),
+            ('agent__name', raw('Ana', True)),
+            ('agent__name', raw('Ana', 2 ** 70)),
+            ('agent__name', raw('Ana', -1)),
+            ('fecha_inicio', raw('mañana', 1)),
+            ('fecha_inicio', raw(20251001, 1)),
+        ):
+            with self.subTest(cursor=cursor):
+                rows, _ = keyset_page(Record.objects.all(), sort_by, cursor, 5)
+                expected, _ = keyset_page(Record.objects.all(), sort_by, None, 5)
+                self.assertEqual([row.id for row in rows], [row.id for row in expected])
+
+        # Un cursor válido sí avanza
+        rows, _ = keyset_page(Record.objects.all(), 'agent__name', encode_cursor('Ana', first[-1].id), 5)
+        self.assertNotIn(first[0].id, [row.id for row in rows])
+
+
+@override_settings(CACHES=NO_CACHE)
+class SearchTests(TestCase):
+    """Búsqueda insensible a acentos (índice trigram) en agente, ubicación y notas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.maria = Agent.objects.create(name='María Pérez', location='CENTRAL')
+        cls.jose = Agent.objects.create(name='José Núñez', location=None)
+        cls.maria_record = Record.objects.create(
+            agent=cls.maria, record_type='vacaciones',
+            fecha_inicio=date(2025, 10, 1), fecha_fin=date(2025, 10, 3),
+        )
+        cls.jose_record = Record.objects.create(
+            agent=cls.jose, record_type='comision', notes='Viaje a Córdoba',
+            fecha_inicio=date(2025, 10, 1), fecha_fin=date(2025, 10, 3),
+        )
+
+    def found(self, query):
+        return set(Record.objects.filter(search.search_filter(query)).values_list('id', flat=True))
+
+    def test_accents_and_case_are_ignored(self):
+        for query, record in (
+            ('maria', self.maria_record), ('MARÍA', self.maria_record),
+            ('pérez', self.maria_record), ('ÑUÑ', self.jose_record),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), {record.id})
+
+    def test_location_and_notes(self):
+        self.assertEqual(self.found('centr'), {self.maria_record.id})
+        self.assertEqual(self.found('cordoba'), {self.jose_record.id})
+        self.assertEqual(self.found('a'), {self.maria_record.id, self.jose_record.id})
+
+    def test_no_match_across_name_and_location(self):
+        for query in ('perez central', 'ez ce', 'ez\ncen'):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), set())
+
+    def test_wildcards_are_literal(self):
+        self.assertEqual(self.found('m*z'), set())
+        self.assertEqual(self.found('mar?a'), set())
+
+    def test_index_follows_changes(self):
+        self.jose.name = 'José Álvarez'
+        self.jose.save()
+        self.assertEqual(self.found('alvarez'), {self.jose_record.id})
+        self.assertEqual(self.found('nunez'), set())
+        self.jose_record.notes = ''
+        self.jose_record.save()
+        self.assertEqual(self.found('cordoba'), set())
+
+
+class BusinessDaysTests(SimpleTestCase):
+    """Días hábiles: sin fines de semana ni feriados de Argentina."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.calendar = business_days.BusinessCalendar(2025, 2026)
+
+    def test_weekends_and_holidays(self):
+        self.assertTrue(self.calendar.is_working_day(date(2025, 11, 21)))
+        self.assertFalse(self.calendar.is_working_day(date(2025, 11, 22)))  # sábado
+        self.assertFalse(self.calendar.is_working_day(date(2025, 11, 23)))  # domingo
+        self.assertFalse(self.calendar.is_working_day(date(2025, 11, 24)))  # feriado trasladable
+        self.assertTrue(self.calendar.is_working_day(date(2025, 11, 25)))
+
+    def test_next_working_day(self):
+        # Viernes -> martes (fin de semana y feriado del lunes)
+        self.assertEqual(self.calendar.next_working_day(date(2025, 11, 21)), date(2025, 11, 25))
+        # Estrictamente posterior, aunque el día sea hábil
+        self.assertEqual(self.calendar.next_working_day(date(2025, 11, 25)), date(2025, 11, 26))
+        # Cruza el año saltando el 1 de enero
+        self.assertEqual(self.calendar.next_working_day(date(2025, 12, 31)), date(2026, 1, 2))
+        self.assertIsNone(self.calendar.next_working_day(date(2026, 12, 31)))
+
+    def test_count_working_days(self):
+        self.assertEqual(self.calendar.count_working_days(date(2025, 11, 20), date(2025, 11, 26)), 4)
+        self.assertEqual(self.calendar.count_working_days(date(2025, 11, 22), date(2025, 11, 24)), 0)
+        self.assertEqual(self.calendar.count_working_days(date(2025, 11, 25), date(2025, 11, 25)), 1)
+        self.assertEqual(self.calendar.count_working_days(date(2025, 11, 26), date(2025, 11, 20)), 0)
+        # Diciembre 2025: 23 días de semana menos el 8 y el 25
+        self.assertEqual(self.calendar.count_working_days(date(2025, 12, 1), date(2025, 12, 31)), 21)
+
+    def test_holidays_between(self):
+        self.assertEqual(
+            [day for day, _ in self.calendar.holidays_between(date(2025, 11, 1), date(2025, 12, 31))],
+            [date(2025, 11, 24), date(2025, 12, 8), date(2025, 12, 25)],
+        )
+
+    def test_weekday_runs(self):
+        self.assertEqual(list(business_days.weekday_runs(date(2025, 11, 22), date(2025, 12, 2))), [
+            (date(2025, 11, 24), date(2025, 11, 28)),
+            (date(2025, 12, 1), date(2025, 12, 2)),
+        ])
+        self.assertEqual(list(business_days.weekday_runs(date(2025, 11, 22), date(2025, 11, 23))), [])
+
+    def test_module_functions_extend_or_clamp_the_span(self):
+        self.assertTrue(business_days.is_working_day(date(1995, 3, 1)))
+        self.assertEqual(business_days.next_working_day(date(1995, 12, 29)), date(1996, 1, 2))
+        # Fuera de MIN_YEAR..MAX_YEAR no hay días hábiles (ni se arma un calendario enorme)
+        self.assertFalse(business_days.is_working_day(date(9999, 12, 1)))
+        self.assertEqual(business_days.count_working_days(date(9999, 1, 1), date(9999, 12, 31)), 0)
+
+
+@override_settings(CACHES=NO_CACHE)
+class OverlapTests(TestCase):
+    """Registros superpuestos del mismo agente y tipo (filtro de duplicados)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'clave-de-prueba')
+        cls.ana = Agent.objects.create(name='Ana', location='CENTRAL')
+        cls.beto = Agent.objects.create(name='Beto', location='CENTRAL')
+
+        def create(agent, record_type, first, last):
+            return Record.objects.create(
+                agent=agent, record_type=record_type,
+                fecha_inicio=date(2025, 10, first), fecha_fin=date(2025, 10, last),
+            ).id
+
+        cls.ids = {
+            # Se tocan el día 5; el 7 queda dentro del segundo
+            'a1': create(cls.ana, 'vacaciones', 1, 5),
+            'a2': create(cls.ana, 'vacaciones', 5, 8),
+            'a3': create(cls.ana, 'vacaciones', 7, 7),
+            # Consecutivos sin superponerse
+            'a4': create(cls.ana, 'vacaciones', 10, 12),
+            'a5': create(cls.ana, 'vacaciones', 13, 14),
+            # El tercero solo se superpone con el primero (que lo contiene)
+            'a6': create(cls.ana, 'vacaciones', 20, 30),
+            'a7': create(cls.ana, 'vacaciones', 22, 23),
+            'a8': create(cls.ana, 'vacaciones', 25, 26),
+            # Mismas fechas, otro tipo: no es duplicado
+            'a9': create(cls.ana, 'comision', 1, 5),
+            # Repetido exacto de otro agente
+            'b1': create(cls.beto, 'vacaciones', 9, 9),
+            'b2': create(cls.beto, 'vacaciones', 9, 9),
+        }
+
+    def test_clusters(self):
+        ids = self.ids
+        self.assertEqual(
+            [(c['agent_id'], c['record_type'], c['start'].day, c['end'].day, c['record_ids'])
+             for c in find_overlap_clusters()],
+            [
+                (self.ana.id, 'vacaciones', 1, 8, [ids['a1'], ids['a2'], ids['a3']]),
+                (self.ana.id, 'vacaciones', 20, 30, [ids['a6'], ids['a7'], ids['a8']]),
+                (self.beto.id, 'vacaciones', 9, 9, [ids['b1'], ids['b2']]),
+            ],
+        )
+
+    def test_overlapping_ids_match_the_clusters(self):
+        expected = {self.ids[key] for key in ('a1', 'a2', 'a3', 'a6', 'a7', 'a8', 'b1', 'b2')}
+        flagged = Record.objects.filter(id__in=overlapping_record_ids()).values_list('id', flat=True)
+        self.assertEqual(set(flagged), expected)
+        clustered = {record_id for c in find_overlap_clusters() for record_id in c['record_ids']}
+        self.assertEqual(clustered, expected)
+
+    def test_api_filters_by_agent(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/api/overlaps/', {'agent': self.beto.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{
+            'agent_id': self.beto.id, 'agent_name': 'Beto', 'record_type': 'vacaciones',
+            'start': '2025-10-09', 'end': '2025-10-09', 'record_ids': [self.ids['b1'], self.ids['b2']],
+        }])
+
+
+@override_settings(CACHES=NO_CACHE)
+class PopulateAgentsTests(TestCase):
+    """populate_agents: sincroniza los agentes con el CSV sin borrar registros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.moved = Agent.objects.create(name='María Pérez', location='NORTE')
+        cls.kept = Agent.objects.create(name='Sin cambios', location='CENTRAL')
+        cls.missing = Agent.objects.create(name='No figura', location='CENTRAL')
+        cls.returning = Agent.objects.create(name='Vuelve', location='SUR', active=False)
+        for agent in (cls.moved, cls.missing):
+            Record.objects.create(
+                agent=agent, record_type='vacaciones',
+                fecha_inicio=date(2025, 10, 1), fecha_fin=date(2025, 10, 3),
+            )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'agents.csv'
+        self.path.write_text(
+            'name,location\n'
+            'María Pérez,CENTRAL\n'
+            'Sin cambios,CENTRAL\n'
+            'Vuelve,SUR\n'
+            'Nuevo Agente,\n'
+            ',SIN NOMBRE\n',
+            encoding='utf-8',
+        )
+
+    def populate(self, *args):
+        out = io.StringIO()
+        call_command('populate_agents', '--file', str(self.path), *args, stdout=out)
+        return out.getvalue()
+
+    def agents(self):
+        rows = Agent.objects.values_list('name', 'location', 'active')
+        return {name: (location, active) for name, location, active in rows}
+
+    def test_sync_without_deactivate(self):
+        output = self.populate()
+        self.assertIn('1 creados, 2 actualizados, 0 desactivados', output)
+        self.assertEqual(self.agents(), {
+            'María Pérez': ('CENTRAL', True),
+            'Sin cambios': ('CENTRAL', True),
+            'No figura': ('CENTRAL', True),
+            'Vuelve': ('SUR', True),
+            'Nuevo Agente': (None, True),
+        })
+        # Los agentes conservan su id y sus registros
+        self.assertEqual(Record.objects.filter(agent__in=[self.moved, self.missing]).count(), 2)
+        # Índice de búsqueda al día (las operaciones en bloque no disparan señales)
+        record = Record.objects.create(
+            agent=Agent.objects.get(name='Nuevo Agente'), record_type='comision',
+            fecha_inicio=date(2025, 10, 1), fecha_fin=date(2025, 10, 1),
+        )
+        self.assertEqual(list(Record.objects.filter(search.search_filter('nuevo'))), [record])
+        self.assertTrue(Record.objects.filter(search.search_filter('central'), agent=self.moved).exists())
+
+    def test_deactivate_missing_agents(self):
+        output = self.populate('--deactivate')
+        self.assertIn('1 desactivados', output)
+        self.assertEqual(self.agents()['No figura'], ('CENTRAL', False))
+        self.assertTrue(Record.objects.filter(agent=self.missing).exists())
+
+    def test_second_run_changes_nothing(self):
+        self.populate('--deactivate')
+        self.assertIn('0 creados, 0 actualizados, 0 desactivados', self.populate('--deactivate'))
+
+    def test_missing_file(self):
+        self.path.unlink()
+        with self.assertRaises(CommandError):
+            self.populate()
+
+
+@override_settings(CACHES=NO_CACHE)
+class AgentStatusTests(TestCase):
+    """Estado precalculado (AgentStatus): señales, cambio de día y carga inicial."""
+
+    def setUp(self):
+        availability._rolled_over_on = None
+        self.addCleanup(setattr, availability, '_rolled_over_on', None)
+        self.today = date.today()
+        self.agent = Agent.objects.create(name='Agente', location='CENTRAL')
+        self.other = Agent.objects.create(name='Otro', location='CENTRAL')
+
+    def create(self, agent, first, last):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Record.objects.create(
+                agent=agent, record_type='vacaciones',
+                fecha_inicio=self.today + timedelta(days=first), fecha_fin=self.today + timedelta(days=last),
+            )
+
+    def snapshot(self, agent):
+        return AgentStatus.objects.filter(agent=agent).values_list(
+            'on_leave', 'leave_end', 'return_date', 'next_leave_start',
+        ).first()
+
+    def test_record_save_and_delete_refresh_the_snapshot(self):
+        current = self.create(self.agent, -2, 3)
+        leave_end = self.today + timedelta(days=3)
+        return_date = business_days.next_working_day(leave_end)
+        self.assertEqual(self.snapshot(self.agent), (True, leave_end, return_date, None))
+
+        upcoming = self.create(self.agent, 10, 12)
+        self.assertEqual(
+            self.snapshot(self.agent), (True, leave_end, return_date, self.today + timedelta(days=10)),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            current.delete()
+        self.assertEqual(self.snapshot(self.agent), (False, None, None, self.today + timedelta(days=10)))
+        with self.captureOnCommitCallbacks(execute=True):
+            upcoming.delete()
+        self.assertIsNone(self.snapshot(self.agent))
+        self.assertTrue(availability.status_for(availability.current_statuses(), self.agent.id)['available'])
+
+    def test_reassigned_record_refreshes_both_agents(self):
+        record = self.create(self.agent, 0, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            record.agent = self.other
+            record.save()
+        self.assertIsNone(self.snapshot(self.agent))
+        self.assertTrue(self.snapshot(self.other)[0])
+
+    def test_rollover_updates_only_rows_that_change_at_midnight(self):
+        monday = date(2025, 10, 6)
+        third = Agent.objects.create(name='Tercero', location='CENTRAL')
+        for agent, first, last in (
+            (self.agent, date(2025, 10, 1), date(2025, 10, 7)),   # termina el martes
+            (self.other, date(2025, 10, 8), date(2025, 10, 10)),  # empieza el miércoles
+            (third, date(2025, 10, 1), date(2025, 10, 31)),        # sigue de licencia
+        ):
+            Record.objects.create(agent=agent, record_type='vacaciones', fecha_inicio=first, fecha_fin=last)
+        availability.refresh_snapshots(today=monday)
+
+        wednesday = date(2025, 10, 8)
+        self.assertEqual(availability.rollover_snapshots(today=wednesday), 2)
+        self.assertIsNone(self.snapshot(self.agent))
+        self.assertEqual(
+            self.snapshot(self.other), (True, date(2025, 10, 10), date(2025, 10, 13), None),
+        )
+        # Ya procesado: un segundo rollover el mismo día no toca nada
+        self.assertEqual(availability.rollover_snapshots(today=wednesday), 0)
+        self.assertEqual(set(AgentStatus.objects.values_list('computed_on', flat=True)), {wednesday})
+
+    def test_migration_backfill_is_completed_on_first_read(self):
+        Record.objects.create(
+            agent=self.agent, record_type='vacaciones',
+            fecha_inicio=self.today, fecha_fin=self.today + timedelta(days=1),
+        )
+        Record.objects.create(
+            agent=self.other, record_type='vacaciones',
+            fecha_inicio=self.today + timedelta(days=5), fecha_fin=self.today + timedelta(days=5),
+        )
+        migration = importlib.import_module('experimentapp.migrations.0008_agentstatus')
+        migration.build_snapshots(apps, SimpleNamespace(connection=connection))
+        self.assertIsNone(self.snapshot(self.agent)[2])
+
+        statuses = availability.current_statuses()
+        leave_end = self.today + timedelta(days=1)
+        self.assertEqual(statuses[self.agent.id], {
+            'available': False,
+            'return_date': business_days.next_working_day(leave_end),
+            'next_leave_start': None,
+        })
+        self.assertEqual(statuses[self.other.id]['next_leave_start'], self.today + timedelta(days=5))
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class ViewCacheTests(TestCase):
+    """Caché de vistas por versión de datos y rol."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-de-prueba')
+        cls.reader = User.objects.create_user('lector', 'lector@example.com', 'clave-de-prueba')
+        cls.agent = Agent.objects.create(name='Agente', location='CENTRAL')
+        # Jueves 20 a miércoles 26 de noviembre de 2025: 4 días hábiles
+        cls.record = Record.objects.create(
+            agent=cls.agent, record_type='vacaciones',
+            fecha_inicio=date(2025, 11, 20), fecha_fin=date(2025, 11, 26),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def total(self, user):
+        self.client.force_login(user)
+        response = self.client.get('/api/balances/', {'year': 2025})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['agents'][0]['total']
+
+    def test_responses_are_reused_until_a_write(self):
+        self.assertEqual(self.total(self.admin), 4)
+        # Sin pasar por el ORM (sin señales) la versión no cambia
+        Record.objects.filter(id=self.record.id).update(fecha_fin=date(2025, 11, 20))
+        self.assertEqual(self.total(self.admin), 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            Record.objects.get(id=self.record.id).save()
+        self.assertEqual(self.total(self.admin), 1)
+
+    def test_roles_are_cached_separately(self):
+        def clusters(user):
+            self.client.force_login(user)
+            return len(self.client.get('/api/overlaps/').json())
+
+        self.assertEqual(clusters(self.admin), 0)
+        # Un duplicado cargado sin señales: solo lo ve el rol que no tenía caché
+        Record.objects.bulk_create([Record(
+            agent=self.agent, record_type='vacaciones',
+            fecha_inicio=date(2025, 11, 24), fecha_fin=date(2025, 11, 24),
+        )])
+        self.assertEqual(clusters(self.reader), 1)
+        self.assertEqual(clusters(self.admin), 0)
+
+    def test_login_does_not_bump_the_version(self):
+        self.assertEqual(self.total(self.admin), 4)
+        Record.objects.filter(id=self.record.id).update(fecha_fin=date(2025, 11, 20))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.client.login(username='admin', password='clave-de-prueba'))
+        self.assertEqual(self.total(self.admin), 4)
+
+    def test_cached_for_data_version(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(cached_for_data_version('prueba', compute, 2025), 1)
+        self.assertEqual(cached_for_data_version('prueba', compute, 2025), 1)
+        self.assertEqual(cached_for_data_version('prueba', compute, 2026), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version()
+        self.assertEqual(cached_for_data_version('prueba', compute, 2025), 3)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class ConditionalGetTests(TestCase):
+    """ETag / If-None-Match: 304 sin ejecutar la vista mientras no cambien los datos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-de-prueba')
+        cls.reader = User.objects.create_user('lector', 'lector@example.com', 'clave-de-prueba')
+        cls.agent = Agent.objects.create(name='Agente', location='CENTRAL')
+        cls.record = Record.objects.create(
+            agent=cls.agent, record_type='vacaciones',
+            fecha_inicio=date(2025, 11, 20), fecha_fin=date(2025, 11, 26),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.calendar_url = f'/agent/{self.agent.id}/calendar-data/'
+        self.window = {'start': '2025-11-01', 'end': '2025-12-01'}
+
+    def revalidate(self, url, etag, params=None):
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def test_calendar_data(self):
+        etag = self.client.get(self.calendar_url, self.window)['ETag']
+        # Autenticación (sesión y usuario) y el agregado del ETag: sin eventos ni feriados
+        with self.assertNumQueries(3):
+            response = self.revalidate(self.calendar_url, etag, self.window)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Otra ventana, otro ETag
+        other = self.revalidate(self.calendar_url, etag, {'start': '2025-12-01', 'end': '2026-01-01'})
+        self.assertEqual(other.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            extra = Record.objects.create(
+                agent=self.agent, record_type='comision',
+                fecha_inicio=date(2025, 11, 27), fecha_fin=date(2025, 11, 27),
+            )
+        response = self.revalidate(self.calendar_url, etag, self.window)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # Al borrar no cambia el máximo de updated_at, sí la cantidad
+        with self.captureOnCommitCallbacks(execute=True):
+            extra.delete()
+        self.assertEqual(self.revalidate(self.calendar_url, etag, self.window).status_code, 200)
+
+    def test_invalid_calendar_range_has_no_etag(self):
+        response = self.client.get(self.calendar_url, {'start': 'ayer'}, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_agent_report(self):
+        url = f'/export-report/{self.agent.id}/'
+        etag = self.revalidate(url, '"otro"')['ETag']
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record.notes = 'Actualizado'
+            self.record.save()
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_full_report_follows_the_data_version(self):
+        url = '/export-full-report/'
+        etag = self.revalidate(url, '"otro"')['ETag']
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agent.save()
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_listing_etag_depends_on_role(self):
+        params = {'view': 'agentes'}
+        etag = self.client.get('/', params)['ETag']
+        self.assertEqual(self.revalidate('/', etag, params).status_code, 304)
+        self.client.force_login(self.reader)
+        response = self.revalidate('/', etag, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
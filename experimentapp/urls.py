@@ -1,20 +1,22 @@
 from django.urls import path
-from django.http import HttpResponse
 from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
-    path('ping/', lambda r: HttpResponse("PONG"), name='ping'),
+    path('records/more/', views.record_rows, name='record_rows'),
+    path('ping/', views.ping, name='ping'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('add-agent/', views.add_agent, name='add_agent'),
     path('edit-agent/<int:agent_id>/', views.edit_agent, name='edit_agent'),
     path('delete-agent/<int:agent_id>/', views.delete_agent, name='delete_agent'),
     path('add-record/', views.add_record, name='add_record'),
+    path('import-records/', views.import_records_view, name='import_records'),
     path('edit-record/<int:record_id>/', views.edit_record, name='edit_record'),
     path('delete-record/<int:record_id>/', views.delete_record, name='delete_record'),
     path('agent/<int:agent_id>/calendar/', views.agent_calendar, name='agent_calendar'),
     path('agent/<int:agent_id>/calendar-data/', views.agent_calendar_data, name='agent_calendar_data'),
+    path('api/agent/<int:agent_id>/status/', views.agent_status_data, name='agent_status_data'),
     path('trigger-population/', views.trigger_population, name='trigger_population'),
     path('debug-db/', views.debug_db, name='debug_db'),
     path('manage-users/', views.manage_users, name='manage_users'),
@@ -24,4 +26,12 @@ urlpatterns = [
     path('delete-user/<int:user_id>/', views.delete_user, name='delete_user'),
     path('export-report/<int:agent_id>/', views.export_agent_report, name='export_agent_report'),
     path('export-full-report/', views.export_full_report, name='export_full_report'),
+    path('export-bundle/', views.export_agent_bundle, name='export_agent_bundle'),
+    path('export-records/', views.export_records, name='export_records'),
+    path('api/absent/', views.absent_agents, name='absent_agents'),
+    path('export-balances/', views.export_balance_report, name='export_balance_report'),
+    path('api/balances/', views.leave_balances_data, name='leave_balances_data'),
+    path('headcount/', views.headcount_dashboard, name='headcount'),
+    path('api/headcount/', views.headcount_data, name='headcount_data'),
+    path('api/overlaps/', views.overlap_clusters, name='overlap_clusters'),
 ]
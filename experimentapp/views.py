@@ -1,177 +1,167 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_http_methods
 from .models import Agent, Record
+from . import absences, balances, business_days, headcount, search
+from .availability import acurrent_statuses, current_statuses, status_for
+from .cache import agents_version, cache_per_role, fingerprint, user_role
+from .conditional import (
+    agent_report_etag, conditional, data_version_etag, listing_etag, records_etag,
+)
+from .importer import import_records
+from .overlaps import find_overlap_clusters, overlapping_record_ids
+from .pagination import keyset_page
+from .reports import (
+    abundle_response, agent_bundle_records, arecords_report_response, balance_report_response,
+    records_stream_response,
+)
 from datetime import datetime, timedelta, date
-import holidays
 from django.core.management import call_command
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
 
+def is_asgi(request):
+    """True si el request llegó por el servidor ASGI (uvicorn)."""
+    return isinstance(request, ASGIRequest)
+
+async def ping(request):
+    return HttpResponse("PONG")
+
+# Los reportes Excel son vistas async: openpyxl corre en el pool de exports
+# y un export lento no ocupa el event loop ni el thread de otros requests.
 @login_required(login_url='login')
-def export_agent_report(request, agent_id):
-    agent = get_object_or_404(Agent, id=agent_id)
+@conditional(agent_report_etag)
+async def export_agent_report(request, agent_id):
+    agent = await aget_object_or_404(Agent, id=agent_id)
     records = Record.objects.filter(agent=agent).order_by('fecha_inicio')
-    
-    # Crear libro de Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Reporte {agent.name[:20]}"
-    
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-    center_align = Alignment(horizontal="center", vertical="center")
-    
-    thin_side = Side(style='thin', color="000000")
-    thin_border = Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
-    
-    # Encabezados
-    headers = ['Agente', 'Tipo de Licencia', 'Fecha Inicio', 'Fecha Fin', 'Notas']
-    for col_num, header_title in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header_title)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-        cell.border = thin_border
-    
-    # Datos
-    for row_num, record in enumerate(records, 2):
-        cells = [
-            ws.cell(row=row_num, column=1, value=agent.name),
-            ws.cell(row=row_num, column=2, value=record.get_record_type_display()),
-            ws.cell(row=row_num, column=3, value=record.fecha_inicio.strftime('%d/%m/%Y')),
-            ws.cell(row=row_num, column=4, value=record.fecha_fin.strftime('%d/%m/%Y')),
-            ws.cell(row=row_num, column=5, value=record.notes or "-")
-        ]
-        for cell in cells:
-            cell.alignment = center_align
-            cell.border = thin_border
-    
-    # Ajustar ancho de columnas (Tabla principal)
-    for i in range(1, 6):
-        max_length = 0
-        column = get_column_letter(i)
-        for cell in ws[column]:
-            try:
-                if cell.value and len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except: pass
-        ws.column_dimensions[column].width = max_length + 5
-
-    # Preparar respuesta
-    filename = "Reporte SIA.xlsx"
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    return await arecords_report_response(
+        records, f"Reporte {agent.name[:20]}", stream_async=is_asgi(request)
     )
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    wb.save(response)
-    return response
 
 @login_required(login_url='login')
-def export_full_report(request):
+@conditional(data_version_etag)
+async def export_full_report(request):
     # Ya no se requiere is_superuser o is_staff, solo estar logueado
     records = Record.objects.all().order_by('agent__name', 'fecha_inicio')
-    
-    # Crear libro de Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Reporte Completo"
-    
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-    center_align = Alignment(horizontal="center", vertical="center")
-    
-    thin_side = Side(style='thin', color="000000")
-    thin_border = Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
-    
-    # Encabezados
-    headers = ['Agente', 'Tipo de Licencia', 'Fecha Inicio', 'Fecha Fin', 'Notas']
-    for col_num, header_title in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header_title)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-        cell.border = thin_border
-    
-    # Datos
-    for row_num, record in enumerate(records, 2):
-        cells = [
-            ws.cell(row=row_num, column=1, value=record.agent.name),
-            ws.cell(row=row_num, column=2, value=record.get_record_type_display()),
-            ws.cell(row=row_num, column=3, value=record.fecha_inicio.strftime('%d/%m/%Y')),
-            ws.cell(row=row_num, column=4, value=record.fecha_fin.strftime('%d/%m/%Y')),
-            ws.cell(row=row_num, column=5, value=record.notes or "-")
-        ]
-        for cell in cells:
-            cell.alignment = center_align
-            cell.border = thin_border
-    
-    # Ajustar ancho de columnas
-    for i in range(1, 6):
-        max_length = 0
-        column = get_column_letter(i)
-        for cell in ws[column]:
-            try:
-                if cell.value and len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except: pass
-        ws.column_dimensions[column].width = max_length + 5
-
-    # Preparar respuesta
-    filename = "Reporte SIA.xlsx"
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    )
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    wb.save(response)
-    return response
+    return await arecords_report_response(records, "Reporte Completo", stream_async=is_asgi(request))
 
-def calculate_agent_status(agent):
+@login_required(login_url='login')
+@conditional(data_version_etag)
+async def export_agent_bundle(request):
     """
-    Calcula el estado de disponibilidad de un agente.
-    
-    Retorna un diccionario con:
-    - 'available': True si el agente está disponible, False si está de licencia
-    - 'return_date': fecha de reintegro (solo si available=False), calculada
-                     considerando solo días hábiles (lun-vie, excluyendo feriados)
+    ZIP con un reporte Excel por agente activo. Acepta ?location= y un rango
+    ?from= / ?to= (se incluyen los registros que se superponen con el rango).
     """
-    today = date.today()
-    
-    # Buscar SOLO registros activos que incluyan HOY (no futuros)
-    # Un agente está de licencia solo si tiene un registro activo en este momento
-    active_records = Record.objects.filter(
-        agent=agent,
-        fecha_inicio__lte=today,
-        fecha_fin__gte=today
-    ).order_by('fecha_inicio')
+    location = request.GET.get('location')
+    date_from = parse_filter_date(request.GET.get('from'))
+    date_to = parse_filter_date(request.GET.get('to'))
+    if (request.GET.get('from') and date_from is None) or (request.GET.get('to') and date_to is None):
+        return HttpResponse("Fecha inválida", status=400)
+    records = agent_bundle_records(location, date_from, date_to)
+    filename = "Reportes por Agente"
+    if location:
+        filename += f" {location}"
+    if date_from or date_to:
+        filename += f" {date_from or '…'} a {date_to or '…'}"
+    return await abundle_response(records, f"{filename}.zip", stream_async=is_asgi(request))
+
+@login_required(login_url='login')
+@conditional(listing_etag)
+def export_records(request):
+    """
+    Export masivo de registros en CSV (por defecto) o JSON lines (?format=jsonl).
+    Acepta los mismos filtros que el panel principal y se genera en streaming.
+    """
+    records = filter_records(Record.objects.all(), request.GET).order_by('agent__name', 'fecha_inicio', 'id')
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        return HttpResponse("Formato no soportado", status=400)
+    return records_stream_response(records, export_format, stream_async=is_asgi(request))
+
+def parse_filter_date(value):
+    """Convierte una fecha de filtro (dd/mm/aaaa o aaaa-mm-dd) o devuelve None."""
+    for fmt in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def filter_records(records, params):
+    """
+    Aplica los filtros del panel (agent, type, search, duplicates, from, to)
+    a un queryset de registros. Compartido por `home` y los exports.
+    """
+    agent_filter = params.get('agent')
+    record_type_filter = params.get('type')
+    search_query = params.get('search')
+    show_duplicates = params.get('duplicates') == 'true'
+    date_from = parse_filter_date(params.get('from'))
+    date_to = parse_filter_date(params.get('to'))
     
-    if not active_records.exists():
-        # No hay registros activos hoy = está disponible
-        # (aunque tenga vacaciones programadas para el futuro)
-        return {'available': True, 'return_date': None}
+    if agent_filter and agent_filter != 'all':
+        records = records.filter(agent_id=agent_filter)
     
-    # Encontrar el último día de licencia de los registros activos
-    last_end_date = max(r.fecha_fin for r in active_records)
+    if record_type_filter:
+        records = records.filter(record_type=record_type_filter)
+    if search_query:
+        # Búsqueda indexada e insensible a acentos (ver search.py)
+        records = records.filter(search.search_filter(search_query))
     
-    # Calcular siguiente día hábil después del último día de licencia
-    return_date = last_end_date + timedelta(days=1)
-    ar_holidays = holidays.AR(years=range(return_date.year, return_date.year + 2))
+    # Rango de fechas: registros que se superponen con [from, to]
+    if date_from:
+        records = records.filter(fecha_fin__gte=date_from)
+    if date_to:
+        records = records.filter(fecha_inicio__lte=date_to)
     
-    # Saltar fines de semana y feriados
-    while return_date.weekday() >= 5 or return_date in ar_holidays:
-        return_date += timedelta(days=1)
-        # Actualizar feriados si cambiamos de año
-        if return_date.year not in ar_holidays.years:
-            ar_holidays = holidays.AR(years=range(return_date.year, return_date.year + 2))
+    if show_duplicates:
+        # Superposiciones en una pasada con funciones de ventana por (agente, tipo).
+        # Solo se acota por agente y tipo (las claves de la partición) para
+        # comparar contra todos los registros del agente, no solo los filtrados.
+        candidates = Record.objects.all()
+        if agent_filter and agent_filter != 'all':
+            candidates = candidates.filter(agent_id=agent_filter)
+        if record_type_filter:
+            candidates = candidates.filter(record_type=record_type_filter)
+        records = records.filter(id__in=overlapping_record_ids(candidates))
+    
+    return records
+
+@login_required(login_url='login')
+@cache_per_role
+def overlap_clusters(request):
+    """API que devuelve los grupos de registros superpuestos (mismo agente y tipo)"""
+    records = Record.objects.all()
+    agent_filter = request.GET.get('agent')
+    record_type_filter = request.GET.get('type')
+    if agent_filter and agent_filter != 'all':
+        records = records.filter(agent_id=agent_filter)
+    if record_type_filter:
+        records = records.filter(record_type=record_type_filter)
     
-    return {'available': False, 'return_date': return_date}
+    clusters = find_overlap_clusters(records)
+    agent_names = dict(
+        Agent.objects.filter(id__in={c['agent_id'] for c in clusters}).values_list('id', 'name')
+    )
+    return JsonResponse([
+        {
+            'agent_id': cluster['agent_id'],
+            'agent_name': agent_names.get(cluster['agent_id']),
+            'record_type': cluster['record_type'],
+            'start': cluster['start'].strftime('%Y-%m-%d'),
+            'end': cluster['end'].strftime('%Y-%m-%d'),
+            'record_ids': cluster['record_ids'],
+        }
+        for cluster in clusters
+    ], safe=False)
 
+@conditional(listing_etag)
+@cache_per_role
 def home(request):
     if not request.user.is_authenticated:
         return render(request, 'experimentapp/home_not_logged.html')
@@ -186,32 +176,10 @@ def home(request):
     record_type_filter = request.GET.get('type')
     search_query = request.GET.get('search')
     show_duplicates = request.GET.get('duplicates') == 'true'
+    date_from = request.GET.get('from')
+    date_to = request.GET.get('to')
     
-    if agent_filter and agent_filter != 'all':
-        records = records.filter(agent_id=agent_filter)
-    
-    if record_type_filter:
-        records = records.filter(record_type=record_type_filter)
-    if search_query:
-        from django.db.models import Q
-        records = records.filter(
-            Q(agent__name__icontains=search_query) | 
-            Q(agent__location__icontains=search_query) | 
-            Q(notes__icontains=search_query)
-        )
-    
-    if show_duplicates:
-        from django.db.models import Exists, OuterRef
-        overlapping = Record.objects.filter(
-            agent=OuterRef('agent'),
-            fecha_inicio__lte=OuterRef('fecha_fin'),
-            fecha_fin__gte=OuterRef('fecha_inicio'),
-            record_type=OuterRef('record_type')
-        ).exclude(id=OuterRef('id'))
-        
-        records = records.annotate(
-            has_overlap=Exists(overlapping)
-        ).filter(has_overlap=True)
+    records = filter_records(records, request.GET)
     
     # Ordenamiento
     sort_by = request.GET.get('sort', 'name' if current_view == 'agentes' else '-fecha_inicio')
@@ -221,20 +189,32 @@ def home(request):
         agent_filter is not None, 
         record_type_filter, 
         search_query, 
-        show_duplicates
+        show_duplicates,
+        date_from,
+        date_to,
     ])
     
+    more_url = None
     if current_view == 'asistencia' and not has_filter:
         records = Record.objects.none()
     elif current_view == 'asistencia':
-        records = records.order_by(sort_by)
+        # Paginación por cursor: solo la primera página, el resto con "Cargar más"
+        records, next_cursor = keyset_page(
+            records, sort_by, request.GET.get('cursor'), settings.RECORDS_PAGE_SIZE
+        )
+        more_url = record_rows_url(request, next_cursor)
+
+    agents = Agent.objects.filter(active=True).order_by('name')
+    # Estados de disponibilidad precalculados (AgentStatus), una sola consulta
+    statuses = {}
+    if current_view in ('agentes', 'de_licencia'):
+        statuses = current_statuses()
 
-    agents = Agent.objects.all().order_by('name')
     if current_view == 'agentes':
-        agents = agents.order_by(sort_by)
+        agents = list(agents.order_by(sort_by))
         # Adjuntar estado de disponibilidad para cada agente en la lista
         for agent in agents:
-            agent.status = calculate_agent_status(agent)
+            agent.status = status_for(statuses, agent.id)
     
     is_admin = request.user.is_superuser
     is_editor = request.user.is_superuser or request.user.is_staff
@@ -243,7 +223,7 @@ def home(request):
     licensing_agents = []
     if current_view == 'de_licencia':
         for agent in agents:
-            status = calculate_agent_status(agent)
+            status = status_for(statuses, agent.id)
             if not status['available']:
                 licensing_agents.append({
                     'agent': agent,
@@ -259,33 +239,128 @@ def home(request):
         'record_types': Record.RECORD_TYPES,
         'current_view': current_view,
         'has_filter': has_filter,
+        'more_url': more_url,
+        # Claves de los fragmentos cacheados (selector y tabla de agentes)
+        'fragment_timeout': settings.VIEW_CACHE_TIMEOUT,
+        'agents_version': agents_version(),
+        'role': user_role(request.user),
+        'sort_by': sort_by,
+        'statuses_key': fingerprint(sorted(statuses.items())) if current_view == 'agentes' else None,
     }
     return render(request, 'experimentapp/home.html', context)
 
+def record_rows_url(request, cursor):
+    """URL del fragmento con la página siguiente (mismos filtros y orden)."""
+    if not cursor:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f"{reverse('record_rows')}?{params.urlencode()}"
+
 @login_required(login_url='login')
+@conditional(listing_etag)
+@cache_per_role
+def record_rows(request):
+    """Fragmento HTML con la siguiente página del listado de asistencia"""
+    records = filter_records(Record.objects.all(), request.GET)
+    records, next_cursor = keyset_page(
+        records, request.GET.get('sort'), request.GET.get('cursor'), settings.RECORDS_PAGE_SIZE
+    )
+    context = {
+        'records': records,
+        'is_editor': request.user.is_superuser or request.user.is_staff,
+    }
+    response = render(request, 'experimentapp/record_rows.html', context)
+    next_url = record_rows_url(request, next_cursor)
+    if next_url:
+        response['X-Next-Url'] = next_url
+    return response
+
+# Ventana máxima de calendar-data (la vista mensual pide hasta 6 semanas)
+CALENDAR_MAX_DAYS = 62
+
+def parse_calendar_range(request):
+    """
+    Lee los parámetros `start`/`end` de FullCalendar (ISO 8601, fin exclusivo).
+    Sin ninguno de los dos se usa el mes actual. Retorna None si falta uno,
+    son inválidos, el rango está vacío, abarca más de CALENDAR_MAX_DAYS o
+    sale de los años del calendario de días hábiles.
+    """
+    if 'start' not in request.GET and 'end' not in request.GET:
+        today = date.today()
+        start = today.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    try:
+        start = date.fromisoformat(request.GET.get('start', '')[:10])
+        end = date.fromisoformat(request.GET.get('end', '')[:10])
+    except ValueError:
+        return None
+    if not 0 < (end - start).days <= CALENDAR_MAX_DAYS:
+        return None
+    if start.year < business_days.MIN_YEAR or end.year > business_days.MAX_YEAR:
+        return None
+    return start, end
+
+@login_required(login_url='login')
+@cache_per_role
 def agent_calendar(request, agent_id):
     agent = get_object_or_404(Agent, id=agent_id)
     records = Record.objects.filter(agent=agent)
     
-    # Obtener todos los agentes para el dropdown
-    all_agents = Agent.objects.all().order_by('name')
+    # Obtener todos los agentes activos para el dropdown (y el actual)
+    all_agents = Agent.objects.filter(Q(active=True) | Q(id=agent.id)).order_by('name')
     
     # Calcular estado de disponibilidad del agente
-    agent_status = calculate_agent_status(agent)
+    agent_status = status_for(current_statuses([agent.id]), agent.id)
     
     context = {
         'agent': agent,
         'records': records,
         'all_agents': all_agents,
         'agent_status': agent_status,
+        'fragment_timeout': settings.VIEW_CACHE_TIMEOUT,
+        'agents_version': agents_version(),
     }
     return render(request, 'experimentapp/agent_calendar.html', context)
 
+def calendar_etag(request, agent_id):
+    """ETag de los eventos de la ventana pedida (un agregado sobre el índice)."""
+    window = parse_calendar_range(request)
+    if window is None:
+        return None
+    start, end = window
+    records = Record.objects.filter(
+        agent_id=agent_id, fecha_inicio__lt=end, fecha_fin__gte=start
+    )
+    return records_etag(records, agent_id, start, end)
+
 @login_required(login_url='login')
-def agent_calendar_data(request, agent_id):
-    """API que devuelve los eventos del calendario en formato JSON"""
-    agent = get_object_or_404(Agent, id=agent_id)
-    records = Record.objects.filter(agent=agent)
+@conditional(calendar_etag)
+@cache_per_role
+async def agent_calendar_data(request, agent_id):
+    """
+    API que devuelve los eventos del calendario en formato JSON.
+
+    Acepta los parámetros `start`/`end` que envía FullCalendar (fin exclusivo)
+    y solo devuelve feriados y licencias de esa ventana; un rango inválido
+    responde 400. Cada tramo de días
+    lunes a viernes consecutivos se envía como un único evento con rango.
+    """
+    window = parse_calendar_range(request)
+    if window is None:
+        return JsonResponse(
+            {'error': f'Rango inválido (start/end ISO 8601, hasta {CALENDAR_MAX_DAYS} días)'},
+            status=400,
+        )
+    agent = await aget_object_or_404(Agent, id=agent_id)
+    start, end = window
+    last_day = end - timedelta(days=1)
+
+    records = [record async for record in Record.objects.filter(
+        agent=agent,
+        fecha_inicio__lte=last_day,
+        fecha_fin__gte=start
+    ).only('record_type', 'fecha_inicio', 'fecha_fin')]
     
     # Mapeo de colores por tipo de registro
     color_map = {
@@ -297,50 +372,206 @@ def agent_calendar_data(request, agent_id):
     
     events = []
     
-    # Obtener el rango de fechas para los feriados
-    all_dates = [r.fecha_inicio for r in records] + [r.fecha_fin for r in records]
-    if all_dates:
-        min_year = min(d.year for d in all_dates)
-        max_year = max(d.year for d in all_dates)
-    else:
-        min_year = datetime.now().year
-        max_year = datetime.now().year
-    
-    # Cargar feriados de Argentina para los años relevantes
-    ar_holidays = holidays.AR(years=range(min_year, max_year + 1))
+    # Feriados de Argentina de la ventana visible (calendario compartido)
+    ar_holidays = business_days.holidays_between(start, last_day)
     
     # Agregar feriados al calendario
-    for date, name in ar_holidays.items():
+    for holiday, name in ar_holidays:
         # Usamos display: 'background' para que solo se vea el color gris sin texto
         # Esto evita que las efemérides sobresalgan de la celda en móviles.
         events.append({
-            'start': date.strftime('%Y-%m-%d'),
+            'start': holiday.strftime('%Y-%m-%d'),
             'backgroundColor': '#e2e8f0',
             'borderColor': '#cbd5e0',
             'display': 'background',
             'allDay': True,
         })
 
-    # Agregar eventos de los registros (días que no vino)
+    # Agregar eventos de los registros (días que no vino), recortados a la ventana
     for record in records:
-        current_date = record.fecha_inicio
         color = color_map.get(record.record_type, '#667eea')  # Color default
-        
-        while current_date <= record.fecha_fin:
-            # Solo marcamos días de lunes a viernes (weekday 0-4)
-            if current_date.weekday() < 5:  # 0=lunes, 4=viernes
-                events.append({
-                    'title': f'{record.get_record_type_display()}',
-                    'start': current_date.strftime('%Y-%m-%d'),
-                    'backgroundColor': color,
-                    'borderColor': color,
-                    'textColor': 'white',
-                    'allDay': True,
-                })
-            current_date += timedelta(days=1)
+        run_start = max(record.fecha_inicio, start)
+        run_end = min(record.fecha_fin, last_day)
+
+        # Solo marcamos días de lunes a viernes, agrupados por semana
+        for first, last in business_days.weekday_runs(run_start, run_end):
+            events.append({
+                'title': f'{record.get_record_type_display()}',
+                'start': first.strftime('%Y-%m-%d'),
+                # FullCalendar usa fin exclusivo para eventos de día completo
+                'end': (last + timedelta(days=1)).strftime('%Y-%m-%d'),
+                'backgroundColor': color,
+                'borderColor': color,
+                'textColor': 'white',
+                'allDay': True,
+            })
     
     return JsonResponse(events, safe=False)
 
+@login_required(login_url='login')
+async def agent_status_data(request, agent_id):
+    """Estado de disponibilidad de un agente en JSON (lee AgentStatus)."""
+    agent = await aget_object_or_404(Agent, id=agent_id)
+    status = status_for(await acurrent_statuses([agent.id]), agent.id)
+    return JsonResponse({
+        'agent': agent.id,
+        'available': status['available'],
+        'return_date': status['return_date'],
+        'next_leave_start': status['next_leave_start'],
+    })
+
+def parse_headcount_range(params):
+    """
+    Rango `from`/`to` del tablero de ocupación (mismo formato que los filtros).
+    Por defecto, el mes actual. Retorna (inicio, fin, error); con fechas fuera
+    de los años del calendario de días hábiles el rango es el mes actual.
+    """
+    start = parse_filter_date(params.get('from'))
+    end = parse_filter_date(params.get('to'))
+    if any(
+        day is not None and not business_days.MIN_YEAR <= day.year <= business_days.MAX_YEAR
+        for day in (start, end)
+    ):
+        start, end, _ = parse_headcount_range({})
+        return start, end, (
+            f'Las fechas deben estar entre los años {business_days.MIN_YEAR} y {business_days.MAX_YEAR}'
+        )
+    if start is None or end is None:
+        today = date.today()
+        start = start or today.replace(day=1)
+        end = end or (start.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    if end < start:
+        return start, end, 'La fecha final es anterior a la inicial'
+    if (end - start).days + 1 > headcount.MAX_DAYS:
+        return start, end, f'El rango no puede superar {headcount.MAX_DAYS} días'
+    return start, end, None
+
+@login_required(login_url='login')
+def headcount_dashboard(request):
+    """Tablero de ausencias por ubicación y día (los datos se piden a headcount_data)."""
+    start, end, _ = parse_headcount_range(request.GET)
+    locations = sorted({
+        location or headcount.NO_LOCATION
+        for location in Agent.objects.filter(active=True).values_list('location', flat=True).distinct()
+    })
+    context = {
+        'start': start,
+        'end': end,
+        'locations': locations,
+        'record_types': Record.RECORD_TYPES,
+    }
+    return render(request, 'experimentapp/headcount.html', context)
+
+@login_required(login_url='login')
+@conditional(listing_etag)
+@cache_per_role
+def headcount_data(request):
+    """
+    API con la cantidad de agentes ausentes por ubicación y día, total y por
+    tipo de licencia. Parámetros: from, to, location, type (todos opcionales).
+    """
+    start, end, error = parse_headcount_range(request.GET)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    record_type = request.GET.get('type') or None
+    if record_type and record_type not in headcount.RECORD_TYPE_CODES:
+        return JsonResponse({'error': 'Tipo de licencia inválido'}, status=400)
+
+    result = headcount.location_headcount(
+        start, end, location=request.GET.get('location') or None, record_type=record_type,
+    )
+    labels = dict(Record.RECORD_TYPES)
+    return JsonResponse({
+        'start': start.strftime('%Y-%m-%d'),
+        'end': end.strftime('%Y-%m-%d'),
+        'days': [day.strftime('%Y-%m-%d') for day in result.days],
+        'working': result.working.tolist(),
+        'record_types': [{'code': code, 'label': labels[code]} for code in result.record_types],
+        'locations': [
+            {
+                'location': location,
+                'staff': result.staff[i],
+                'absent': result.absent[i].tolist(),
+                'by_type': {
+                    code: result.by_type[t, i].tolist()
+                    for t, code in enumerate(result.record_types)
+                },
+            }
+            for i, location in enumerate(result.locations)
+        ],
+    })
+
+@login_required(login_url='login')
+@conditional(listing_etag)
+def absent_agents(request):
+    """
+    Agentes de licencia en una fecha (?date=, por defecto hoy) o en un rango
+    (?from=&to=), desde el índice en memoria (absences.py), sin consultar la
+    tabla de registros.
+    """
+    if 'from' in request.GET or 'to' in request.GET:
+        start = parse_filter_date(request.GET.get('from'))
+        end = parse_filter_date(request.GET.get('to'))
+    else:
+        start = end = parse_filter_date(request.GET.get('date', date.today().isoformat()))
+    if start is None or end is None:
+        return JsonResponse({'error': 'Fecha inválida'}, status=400)
+    if end < start:
+        return JsonResponse({'error': 'La fecha final es anterior a la inicial'}, status=400)
+
+    return JsonResponse({
+        'from': start.strftime('%Y-%m-%d'),
+        'to': end.strftime('%Y-%m-%d'),
+        'absent': [
+            {
+                'agent_id': row['agent_id'],
+                'record_id': row['record_id'],
+                'record_type': row['record_type'],
+                'start': row['fecha_inicio'].strftime('%Y-%m-%d'),
+                'end': row['fecha_fin'].strftime('%Y-%m-%d'),
+            }
+            for row in absences.absent_between(start, end)
+        ],
+    })
+
+def parse_year(params):
+    """Año del parámetro `year` (por defecto el actual) o None si es inválido."""
+    try:
+        year = int(params.get('year', date.today().year))
+    except ValueError:
+        return None
+    return year if 1900 <= year <= 2100 else None
+
+@login_required(login_url='login')
+@conditional(data_version_etag)
+@cache_per_role
+def leave_balances_data(request):
+    """
+    API con los días hábiles de licencia usados por cada agente en el año
+    (?year=, por defecto el actual), por tipo y en total. ?agent= filtra un agente.
+    """
+    year = parse_year(request.GET)
+    if year is None:
+        return JsonResponse({'error': 'Año inválido'}, status=400)
+    rows = balances.year_balances(year)
+    agent_filter = request.GET.get('agent')
+    if agent_filter:
+        rows = [row for row in rows if str(row['agent_id']) == agent_filter]
+    return JsonResponse({
+        'year': year,
+        'record_types': [{'code': code, 'label': label} for code, label in Record.RECORD_TYPES],
+        'agents': rows,
+    })
+
+@login_required(login_url='login')
+@conditional(data_version_etag)
+def export_balance_report(request):
+    """Excel con los días hábiles de licencia usados por agente y tipo en el año."""
+    year = parse_year(request.GET)
+    if year is None:
+        return HttpResponse("Año inválido", status=400)
+    return balance_report_response(balances.year_balances(year), year)
+
 def login_view(request):
     if request.method == "POST":
         username = request.POST.get("username")
@@ -431,13 +662,33 @@ def add_record(request):
             )
         return redirect('home')
     
-    agents = Agent.objects.all().order_by('name')
+    agents = Agent.objects.filter(active=True).order_by('name')
     context = {
         'agents': agents,
         'record_types': Record.RECORD_TYPES
     }
     return render(request, 'experimentapp/add_record.html', context)
 
+@login_required(login_url='login')
+def import_records_view(request):
+    if not (request.user.is_superuser or request.user.is_staff):
+        return HttpResponse("No autorizado", status=403)
+    
+    context = {}
+    if request.method == "POST":
+        upload = request.FILES.get('file')
+        dry_run = request.POST.get('dry_run') == 'true'
+        if not upload:
+            context['error'] = 'Seleccione un archivo para importar'
+        else:
+            try:
+                context['result'] = import_records(upload, upload.name, dry_run=dry_run)
+                context['dry_run'] = dry_run
+            except ValueError as e:
+                context['error'] = str(e)
+    
+    return render(request, 'experimentapp/import_records.html', context)
+
 @login_required(login_url='login')
 def edit_record(request, record_id):
     if not (request.user.is_superuser or request.user.is_staff):
@@ -464,7 +715,7 @@ def edit_record(request, record_id):
         record.save()
         return redirect('home')
     
-    agents = Agent.objects.all().order_by('name')
+    agents = Agent.objects.filter(Q(active=True) | Q(id=record.agent_id)).order_by('name')
     context = {
         'record': record,
         'agents': agents,
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'experimento.settings')
 
 application = get_asgi_application()
+
+# Con preload_app (gunicorn.conf.py) esto corre en el maestro, antes del fork
+from experimento import warmup  # noqa: E402
+
+warmup.warm()
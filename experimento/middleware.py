@@ -0,0 +1,257 @@
+"""
+Instrumentación de rendimiento por request.
+
+`PerformanceMiddleware` mide, para una fracción configurable de los requests
+(settings.PERFORMANCE_SAMPLE_RATE), la cantidad y el tiempo de las consultas
+SQL (con `connection.execute_wrapper`), el tiempo de la vista, el tiempo de
+renderizado de templates y el tamaño de la respuesta. Los publica como
+encabezado `Server-Timing` (visible en las herramientas de desarrollo del
+navegador) y, si el request tardó al menos settings.PERFORMANCE_SLOW_MS
+milisegundos (0: todos), como una línea JSON en el logger
+`experimento.performance`.
+
+Debe ir al principio de MIDDLEWARE para que el tiempo total incluya al resto.
+
+`CompressionMiddleware` comprime las respuestas HTML/JSON de las vistas.
+
+Todos funcionan en modo sync y async (como los middlewares de Django): en
+modo ASGI basta un middleware solo sincrónico en la cadena para que cada
+request pase a un thread antes de llegar a las vistas async.
+"""
+import contextvars
+import json
+import logging
+import random
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.template.base import Template
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+logger = logging.getLogger('experimento.performance')
+
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = perf_counter()
+        self.view_started = None
+        self.view_time = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Se usa como execute_wrapper de cada conexión
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_time += perf_counter() - started
+
+
+@contextmanager
+def query_wrapper(wrapper):
+    """Instala `wrapper` como execute_wrapper de todas las conexiones del thread."""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        yield
+
+
+@asynccontextmanager
+async def aquery_wrapper(wrapper):
+    """
+    `query_wrapper` para middlewares async. Las conexiones son por thread y
+    las consultas de las vistas async corren con sync_to_async en el thread
+    del request (thread_sensitive): el wrapper se instala y se quita ahí.
+    """
+    stack = ExitStack()
+    await sync_to_async(stack.enter_context)(query_wrapper(wrapper))
+    try:
+        yield
+    finally:
+        await sync_to_async(stack.close)()
+
+
+def _install_template_timer():
+    """Envuelve Template._render una sola vez para medir el renderizado."""
+    if getattr(Template._render, 'is_performance_timer', False):
+        return
+    original_render = Template._render
+
+    def _render(self, context):
+        profile = _current_profile.get()
+        if profile is None:
+            return original_render(self, context)
+        # Solo se mide el template exterior (extends/include están anidados)
+        profile.template_depth += 1
+        started = perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            profile.template_depth -= 1
+            if profile.template_depth == 0:
+                profile.template_time += perf_counter() - started
+
+    _render.is_performance_timer = True
+    Template._render = _render
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.sample_rate = getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 1.0)
+        self.server_timing = getattr(settings, 'PERFORMANCE_SERVER_TIMING', True)
+        self.slow_ms = getattr(settings, 'PERFORMANCE_SLOW_MS', 500)
+        _install_template_timer()
+
+    def sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        profile = self.start(request)
+        with self.current(profile), query_wrapper(profile):
+            response = self.get_response(request)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        profile = self.start(request)
+        with self.current(profile):
+            async with aquery_wrapper(profile):
+                response = await self.get_response(request)
+        return self.finish(request, response, profile)
+
+    def start(self, request):
+        profile = RequestProfile()
+        request._performance_profile = profile
+        return profile
+
+    @contextmanager
+    def current(self, profile):
+        token = _current_profile.set(profile)
+        try:
+            yield
+        finally:
+            _current_profile.reset(token)
+
+    def finish(self, request, response, profile):
+        if profile.view_started is not None:
+            profile.view_time = perf_counter() - profile.view_started
+        self.report(request, response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, '_performance_profile', None)
+        if profile is not None:
+            profile.view_started = perf_counter()
+            request._performance_view = f'{view_func.__module__}.{view_func.__name__}'
+        return None
+
+    def report(self, request, response, profile):
+        total_ms = (perf_counter() - profile.started) * 1000
+        size = None if response.streaming else len(response.content)
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={profile.query_time * 1000:.1f};desc="{profile.query_count} queries"',
+                f'view;dur={profile.view_time * 1000:.1f}',
+                f'tpl;dur={profile.template_time * 1000:.1f}',
+                f'total;dur={total_ms:.1f}',
+            ])
+
+        if total_ms < self.slow_ms:
+            return
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request, '_performance_view', None),
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'view_ms': round(profile.view_time * 1000, 2),
+            'db_ms': round(profile.query_time * 1000, 2),
+            'queries': profile.query_count,
+            'template_ms': round(profile.template_time * 1000, 2),
+            'bytes': size,
+        }))
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Comprime con gzip las respuestas de la aplicación (HTML, JSON, CSV).
+
+    Los estáticos no pasan por acá: WhiteNoise responde antes y sirve sus
+    copias .br/.gz ya comprimidas. Se omiten los formatos que ya vienen
+    comprimidos (xlsx y zip son archivos zip, imágenes), donde gzip solo
+    gastaría CPU.
+    """
+    skip_content_types = (
+        'application/vnd.openxmlformats',
+        'application/zip',
+        'image/',
+    )
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith(self.skip_content_types):
+            return response
+        return super().process_response(request, response)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise con soporte async: los estáticos se sirven igual (en un
+    thread, porque buscan y abren archivos) y el resto de los requests
+    sigue en el event loop hacia las vistas async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    def serve_static(self, request):
+        """Respuesta del archivo estático pedido o None si no es un estático."""
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return None
+        return self.serve(static_file, request)
+
+    async def __acall__(self, request):
+        if self.autorefresh or request.path_info in self.files:
+            response = await sync_to_async(self.serve_static)(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
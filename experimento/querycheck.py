@@ -0,0 +1,174 @@
+"""
+Detector de consultas N+1.
+
+Durante un request se registra cada consulta SQL por "forma" (el SQL con las
+listas de parámetros colapsadas) y por punto de llamada (la primera línea de
+código del proyecto en la pila y, si la consulta sale de un template, el
+template y la línea). Si la misma forma se repite desde el mismo lugar más de
+settings.NPLUSONE_THRESHOLD veces, se informa según settings.NPLUSONE_MODE:
+
+- "off": desactivado (no agrega costo)
+- "log": advertencia en el logger `experimento.nplusone`
+- "raise": lanza NPlusOneError (útil en desarrollo y en los tests)
+
+`QueryBudgetMixin` permite fijar en los tests un máximo de consultas por vista
+y verificar que no haya patrones N+1.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from .middleware import aquery_wrapper, query_wrapper
+
+logger = logging.getLogger('experimento.nplusone')
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+_TEMPLATE_BASE = os.path.join('django', 'template')
+# Instrumentación propia: sus frames no cuentan como punto de llamada
+_SKIP_FILES = (__file__, os.path.join(os.path.dirname(__file__), 'middleware.py'))
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def sql_shape(sql):
+    """SQL normalizado: listas IN (%s, %s, ...) colapsadas y espacios unificados."""
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('(%s...)', sql)).strip()
+
+
+def _call_site():
+    """(archivo:línea del proyecto, template:línea o None) de la consulta actual."""
+    project_dir = str(settings.BASE_DIR)
+    code_site = None
+    template_site = None
+    frame = sys._getframe(2)
+    while frame is not None and (code_site is None or template_site is None):
+        filename = frame.f_code.co_filename
+        if template_site is None and _TEMPLATE_BASE in filename:
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template_site = f'{origin.template_name or origin.name}:{token.lineno}'
+        if (
+            code_site is None
+            and filename.startswith(project_dir)
+            and 'site-packages' not in filename
+            and filename not in _SKIP_FILES
+        ):
+            code_site = f'{filename[len(project_dir) + 1:]}:{frame.f_lineno}'
+        frame = frame.f_back
+    return code_site, template_site
+
+
+class QueryPatternRecorder:
+    """execute_wrapper que cuenta consultas por (forma, punto de llamada)."""
+
+    def __init__(self):
+        self.patterns = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.patterns[(sql_shape(sql),) + _call_site()] += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        return [
+            {'sql': sql, 'call_site': code_site, 'template': template_site, 'count': count}
+            for (sql, code_site, template_site), count in self.patterns.most_common()
+            if count > threshold
+        ]
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryPatternRecorder()
+    with query_wrapper(recorder):
+        yield recorder
+
+
+def describe(pattern):
+    location = pattern['call_site'] or '?'
+    if pattern['template']:
+        location += f" (template {pattern['template']})"
+    return f"{pattern['count']}x desde {location}: {pattern['sql'][:300]}"
+
+
+class NPlusOneMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.mode = getattr(settings, 'NPLUSONE_MODE', 'off')
+        self.threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if self.mode == 'off':
+            return self.get_response(request)
+
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if self.mode == 'off':
+            return await self.get_response(request)
+
+        recorder = QueryPatternRecorder()
+        async with aquery_wrapper(recorder):
+            response = await self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        repeated = recorder.repeated(self.threshold)
+        if repeated:
+            message = f'Posible N+1 en {request.method} {request.path}:\n' + '\n'.join(
+                describe(pattern) for pattern in repeated
+            )
+            if self.mode == 'raise':
+                raise NPlusOneError(message)
+            logger.warning(message)
+
+
+class QueryBudgetMixin:
+    """
+    Mixin para TestCase:
+
+        class HomeTests(QueryBudgetMixin, TestCase):
+            def test_agentes(self):
+                with self.assertQueryBudget(6):
+                    self.client.get('/?view=agentes')
+    """
+    nplusone_threshold = 5
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, using='default'):
+        with CaptureQueriesContext(connections[using]) as captured, record_queries() as recorder:
+            yield captured
+        self.assertLessEqual(
+            len(captured), max_queries,
+            f'{len(captured)} consultas (presupuesto: {max_queries}):\n'
+            + '\n'.join(q['sql'] for q in captured.captured_queries),
+        )
+        self.assertNoRepeatedQueries(recorder)
+
+    def assertNoRepeatedQueries(self, recorder):
+        repeated = recorder.repeated(self.nplusone_threshold)
+        self.assertFalse(repeated, 'Posible N+1:\n' + '\n'.join(describe(p) for p in repeated))
@@ -1,6 +1,7 @@
 from pathlib import Path
 import os
 import dj_database_url
+from django.utils.deprecation import MiddlewareMixin
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,8 +27,11 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'experimento.middleware.PerformanceMiddleware',
+    'experimento.querycheck.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'experimento.middleware.StaticFilesMiddleware',
+    'experimento.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -37,13 +41,8 @@ MIDDLEWARE = [
     'experimento.settings.ExceptionLoggingMiddleware',
 ]
 
-class ExceptionLoggingMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        return self.get_response(request)
-
+class ExceptionLoggingMiddleware(MiddlewareMixin):
+    # MiddlewareMixin: funciona en modo sync y async (ver experimento/middleware.py)
     def process_exception(self, request, exception):
         import traceback
         import sys
@@ -58,17 +57,27 @@ class ExceptionLoggingMiddleware:
 ROOT_URLCONF = 'experimento.urls'
 
 
+_TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # En producción los templates se compilan una vez por proceso
+            # (y antes del fork, ver experimento/warmup.py); en desarrollo se
+            # releen al cambiar
+            'loaders': _TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', _TEMPLATE_LOADERS),
+            ],
         },
     },
 ]
@@ -77,14 +86,65 @@ TEMPLATES = [
 WSGI_APPLICATION = 'experimento.wsgi.application'
 
 
+# Modo ASGI (uvicorn): las conexiones persistentes no se reutilizan entre
+# threads de requests async, así que se cierran al terminar cada request
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "False") == "True"
+
 DATABASES = {
     "default": dj_database_url.config(
         default="sqlite:///" + str(BASE_DIR / "db.sqlite3"),
-        conn_max_age=600
+        conn_max_age=0 if ASYNC_MODE else 600
     )
 }
 
 
+# Caché: "file" (compartida por los workers de la máquina), "redis" (requiere
+# el paquete redis y REDIS_URL) o "locmem" (un solo proceso, desarrollo)
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "file")
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif CACHE_BACKEND == "locmem":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+        }
+    }
+
+# Instrumentación por request (Server-Timing y log JSON en experimento.performance)
+PERFORMANCE_SAMPLE_RATE = float(os.environ.get("PERFORMANCE_SAMPLE_RATE", "1.0"))
+PERFORMANCE_SERVER_TIMING = os.environ.get("PERFORMANCE_SERVER_TIMING", "True") == "True"
+# Solo se loguean los requests que tardan al menos esto (0: todos)
+PERFORMANCE_SLOW_MS = float(os.environ.get("PERFORMANCE_SLOW_MS", "500"))
+
+# Detector de consultas N+1 (experimento/querycheck.py): off, log o raise
+NPLUSONE_MODE = os.environ.get("NPLUSONE_MODE", "log" if DEBUG else "off")
+NPLUSONE_THRESHOLD = int(os.environ.get("NPLUSONE_THRESHOLD", "5"))
+
+# Threads para generar reportes Excel en modo ASGI (bajo WSGI se usa el thread del request)
+EXPORT_THREADS = int(os.environ.get("EXPORT_THREADS", "2"))
+# Procesos para el paquete de reportes por agente (0 = uno por CPU)
+REPORT_PROCESSES = int(os.environ.get("REPORT_PROCESSES", "0"))
+
+# Vigencia de las respuestas cacheadas (se invalidan antes al cambiar los datos)
+VIEW_CACHE_TIMEOUT = int(os.environ.get("VIEW_CACHE_TIMEOUT", "3600"))
+
+# Segundos entre reconstrucciones completas del índice de ausencias en memoria
+# (entre medio se sincroniza de forma incremental, ver experimentapp/absences.py)
+ABSENCE_INDEX_MAX_AGE = int(os.environ.get("ABSENCE_INDEX_MAX_AGE", "3600"))
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -116,10 +176,35 @@ DATE_INPUT_FORMATS = [
     '%Y-%m-%d',
 ]
 
+# Calendario de días hábiles (feriados AR) precalculado por worker
+BUSINESS_CALENDAR_YEARS_BACK = int(os.environ.get("BUSINESS_CALENDAR_YEARS_BACK", "5"))
+BUSINESS_CALENDAR_YEARS_AHEAD = int(os.environ.get("BUSINESS_CALENDAR_YEARS_AHEAD", "2"))
+
+# Filas por página en el listado de asistencia (paginación por cursor)
+RECORDS_PAGE_SIZE = int(os.environ.get("RECORDS_PAGE_SIZE", "100"))
+
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# En producción collectstatic (paso obligatorio del deploy: Dockerfile,
+# build.sh) agrega un hash al nombre de cada archivo y genera copias .gz/.br;
+# WhiteNoise sirve esos archivos con caché "immutable" de 10 años (el nombre
+# cambia cuando cambia el contenido). Sin manifiesto se usan los nombres
+# originales (ver experimento/storage.py). Las librerías de front-end están
+# versionadas y se verifican con `manage.py vendor_assets`.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+            else "experimento.storage.HashedStaticFilesStorage"
+        ),
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Security settings for HTTPS/SSL
@@ -169,9 +254,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        # Con DEBUG=True el nivel DEBUG imprime cada consulta; usar
+        # DB_LOG_LEVEL=DEBUG solo para depurar puntualmente
         'django.db.backends': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': os.environ.get("DB_LOG_LEVEL", "INFO"),
             'propagate': False,
         },
         'django.request': {
@@ -179,5 +266,15 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'experimento.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'experimento.nplusone': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
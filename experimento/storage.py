@@ -0,0 +1,26 @@
+"""
+Almacenamiento de estáticos de producción.
+
+Es el de WhiteNoise (collectstatic agrega un hash al nombre y genera copias
+.gz/.br), salvo que si todavía no hay manifiesto (no se ejecutó
+collectstatic) las URLs usan el nombre original, como StaticFilesStorage, en
+lugar de que todas las páginas respondan 500. Se avisa una vez en el log.
+Con manifiesto, un archivo que no figure en él sigue siendo un error.
+"""
+import logging
+
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+logger = logging.getLogger(__name__)
+
+
+class HashedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    warned = False
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            if not self.warned:
+                self.warned = True
+                logger.warning('No hay manifiesto de estáticos: ejecute collectstatic')
+            return name
+        return super().stored_name(name)
@@ -0,0 +1,64 @@
+"""
+Precalentamiento del proceso antes de atender requests.
+
+Se llama desde wsgi.py / asgi.py. Con `preload_app` de gunicorn corre una sola
+vez en el proceso maestro, antes del fork: los workers heredan el calendario
+de feriados, los templates compilados y el resolver de URLs ya armados y
+comparten esas páginas de memoria (copy-on-write) en vez de construirlos con
+el primer request.
+"""
+import logging
+import os
+from time import perf_counter
+
+from django.conf import settings
+from django.template import engines
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+
+def _project_templates(engine):
+    """Nombres de los templates del proyecto (no los de django.contrib)."""
+    base_dir = str(settings.BASE_DIR)
+    # Directorios de los loaders configurados (con loaders explícitos
+    # engine.template_dirs no incluye los de las apps)
+    template_dirs = {
+        str(template_dir)
+        for loader in engine.engine.template_loaders
+        for template_dir in loader.get_dirs()
+    }
+    for template_dir in sorted(template_dirs):
+        if not template_dir.startswith(base_dir):
+            continue
+        for root, _dirs, files in os.walk(template_dir):
+            for filename in files:
+                if filename.endswith('.html'):
+                    yield os.path.relpath(os.path.join(root, filename), template_dir)
+
+
+def warm_templates():
+    """Compila los templates (quedan en el loader cacheado)."""
+    count = 0
+    for engine in engines.all():
+        for name in _project_templates(engine):
+            engine.get_template(name)
+            count += 1
+    return count
+
+
+def warm():
+    started = perf_counter()
+
+    # Importa todas las vistas (openpyxl, reportes, etc.) y arma el resolver
+    reverse('home')
+
+    # Calendario de días hábiles (feriados) del rango por defecto
+    from experimentapp import business_days
+    business_days.warm()
+
+    templates = warm_templates()
+
+    elapsed = (perf_counter() - started) * 1000
+    logger.info(f'Precalentamiento: {templates} templates, URLs y feriados en {elapsed:.0f} ms')
+    return elapsed
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'experimento.settings')
 
 application = get_wsgi_application()
+
+# Con preload_app (gunicorn.conf.py) esto corre en el maestro, antes del fork
+from experimento import warmup  # noqa: E402
+
+warmup.warm()
@@ -0,0 +1,101 @@
+"""
+Configuración de gunicorn (se carga sola al ejecutar `gunicorn` en este directorio).
+
+- preload_app: Django, las vistas, los templates y el calendario de feriados
+  se cargan una vez en el maestro (ver experimento/warmup.py) y los workers
+  los heredan al hacer fork, así que arrancan listos.
+- Workers y threads según CPU y memoria disponibles (respetando los límites
+  del contenedor). Se pueden fijar con WEB_CONCURRENCY y GUNICORN_THREADS.
+- ASYNC_MODE=True usa la aplicación ASGI con workers de uvicorn.
+- Registra cuánto tarda en estar listo el maestro y cada worker.
+"""
+import gc
+import math
+import os
+import time
+
+_started = time.monotonic()
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPUs usables: cuota del cgroup (contenedores) o afinidad del proceso."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    quota = _read('/sys/fs/cgroup/cpu.max')  # cgroup v2: "<cuota> <período>" o "max <período>"
+    if quota and not quota.startswith('max'):
+        limit, period = (int(value) for value in quota.split())
+        cpus = min(cpus, max(1, math.ceil(limit / period)))
+    return cpus
+
+
+def available_memory_mb():
+    """Memoria usable: límite del cgroup o memoria física."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read(path)
+        if value and value.isdigit() and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+
+
+ASYNC_MODE = os.environ.get('ASYNC_MODE', 'False') == 'True'
+# Memoria aproximada de un worker con Django + openpyxl cargados
+WORKER_MEMORY_MB = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', '150'))
+
+cpus = available_cpus()
+memory_mb = available_memory_mb()
+# 2 x CPU + 1 requests en paralelo, repartidos entre los procesos que entran
+# en memoria; lo que no entra en procesos se atiende con threads
+concurrency = 2 * cpus + 1
+max_workers = max(1, memory_mb // WORKER_MEMORY_MB)
+
+workers = int(os.environ.get('WEB_CONCURRENCY', min(concurrency, max_workers)))
+if ASYNC_MODE:
+    wsgi_app = 'experimento.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    threads = 1
+else:
+    wsgi_app = 'experimento.wsgi:application'
+    threads = int(os.environ.get('GUNICORN_THREADS', max(1, math.ceil(concurrency * 2 / workers))))
+    worker_class = 'gthread' if threads > 1 else 'sync'
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))  # exports grandes
+keepalive = 5
+# Reciclar workers de a poco para acotar el crecimiento de memoria
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    server.log.info(
+        f'Listo en {time.monotonic() - _started:.2f} s '
+        f'({cpus} CPU, {memory_mb} MB): {workers} workers {worker_class} x {threads} threads, '
+        f'preload={preload_app}'
+    )
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Las conexiones abiertas en el maestro no se comparten con los workers
+        from django.db import connections
+        connections.close_all()
+        # Lo cargado hasta acá no lo recorre el GC de los workers, así no
+        # escriben (ni copian) las páginas heredadas
+        gc.freeze()
+    worker._spawned_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    worker.log.info(
+        f'Worker {worker.pid} listo en {time.monotonic() - worker._spawned_at:.2f} s'
+    )